@@ -1,9 +1,30 @@
 import streamlit as st
 import time
-import google.generativeai as genai
 import os
-import re
 import base64
+import html
+import queue
+import uuid
+
+from pipeline import (
+    DEFAULT_HEDGE_POLICY,
+    STAGE_LABELS,
+    STAGE_ORDER,
+    configure_gemini,
+    generate_text_hedged,
+    input_key,
+    market_radar_prompt,
+    refresh_stages,
+    run_variants_async,
+    segmentation_prompt,
+    stage_hash,
+    submit,
+    target_lens_prompt,
+)
+from export import FORMATS, Section, build_export, cache_stats
+from render import RENDER_STATS, cached_html
+from similarity import SimilarityIndex
+from store import ReportStore
 
 # --- Helpers ---------------------------------------------------------------
 
@@ -16,26 +37,6 @@ def get_image_as_base64(file_path):
         st.error(f"Logo file '{file_path}' not found. Please ensure 'StartWiseLogo.jpeg' is in the same directory as 'app.py'.")
         return ""
 
-def clean_model_markdown(text: str) -> str:
-    """
-    Cleanups for model output so we don't render stray HTML tags as text and
-    remove unwanted headings like "Generated Persona Image".
-
-    - remove any lines that are just <div> or </div>
-    - (safety) remove bare opening/closing div tags inline as well
-    - strip lines containing the phrase "Generated Persona Image" (any case)
-    - collapse extra whitespace
-    """
-    # remove lines that only contain <div> or </div> (with optional spaces)
-    text = re.sub(r"^\s*</?div>\s*$", "", text, flags=re.IGNORECASE | re.MULTILINE)
-    # remove any stray standalone <div> / </div> that might appear inline
-    text = re.sub(r"\s*</?div>\s*", " ", text, flags=re.IGNORECASE)
-    # remove headings/lines that mention "Generated Persona Image"
-    text = re.sub(r"^.*Generated\s*Persona\s*Image.*$", "", text, flags=re.IGNORECASE | re.MULTILINE)
-    # compact multiple blank lines
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    return text.strip()
-
 # --- Branding assets -------------------------------------------------------
 
 LOGO_FILE = "StartWiseLogo.jpeg"
@@ -424,132 +425,13 @@ st.markdown(tabs_font_css, unsafe_allow_html=True)
 # --- Gemini config (TEXT model only) ---------------------------------------
 
 try:
-    API_KEY = "YOUR_GEMINI_API_KEY"
-    genai.configure(api_key=API_KEY)
+    configure_gemini()
     GEMINI_ENABLED = True
 except Exception as e:
     st.error(f"Error configuring Gemini API: {e}. Please check the API key.")
     GEMINI_ENABLED = False
 
-# --- Prompts (no image instructions anywhere) ------------------------------
-
-SEGMENTATION_PROMPT_TEMPLATE = """
-You are a Startup Market Segmentation Expert with access to generative tools and data APIs.
-
----
-### USER INPUTS
-* **Startup Idea:** {idea}
-* **Launch Plan:** {launch_plan}
----
-
-Based on these inputs, generate a detailed market segmentation analysis.
-
-### Your objectives:
-1. Generate detailed target market and customer segmentation for the startup’s product idea.
-
----
-### Step 1: Primary Target Market
-Write one crisp sentence defining:
-* The broad target market (country, demographics, psychographic need) based on the user's inputs.
----
-### Step 2: Customer Segments (3–5)
-For each segment, provide:
-* **Segment Name:** Catchy but descriptive
-* **Demographics:** Age, gender, income, geography
-* **Psychographics:** Values, attitudes, lifestyle
-* **Buying Motivations:** Key reasons to purchase
-* **Pain Points / Unmet Needs:**
-* **Channels & Media Preferences:** (Instagram, Blinkit, Zomato, LinkedIn, etc.)
-* **Price Sensitivity:** High / Medium / Low
-* **Fit with Brand:** High / Medium / Low
-* **Persona Summary:** ≤80 words; written like a short story about this person’s daily life
-Use realistic, India-specific details and current digital behavior cues based on the user's inputs.
----
-### Step 3: Segment Prioritization
-* Identify 1–2 high-priority segments to target first, and justify clearly.
-* **Suggest the key marketing message or value proposition for them.**
----
-### Step 4: Positioning Implication
-* Define how the brand should position itself to attract these top segments.
-* Suggest tone of voice and visual style cues for creatives.
----
-### Step 5: Risks / Overlooked Audiences
-* Highlight blind spots, compliance or regulatory concerns (e.g., FSSAI for beverages), and emerging opportunities.
----
-### Step 6: Output Formatting
-Return your answer using clean, readable Markdown (headings, bullets) for clarity. If you create tables, ensure they are valid Markdown tables.
----
-### Constraints
-* Keep it concise, practical, and realistic to the Indian market.
-* Use INR and Asia/Kolkata context.
-* Avoid generic phrasing; show behavioral, digital, and cultural nuance relevant to the user's idea.
-"""
-
-TL_PROMPT_TEMPLATE = """
-You are a Competitive Intelligence and Marketing Landscape Analyst.
-
----
-### STARTUP CONTEXT (Input)
-{segmentation_data}
----
-### YOUR TASK
-Based *only* on the context above (startup idea, target market, personas), generate the following competitive analysis:
-
-Step 1 | Competitor Identification
-* Identify 5–7 direct and indirect competitors in the same product category and geography.
-* Mention each brand’s focus (e.g., RTD coffee, café chain, functional beverage).
-* Add URLs or handles where possible. If you infer, mark “(assumed).”
-
-Step 2 | Competitor Landscape Summary (Table)
-For each competitor, compile:
-* Brand Positioning (self-description)
-* Price Tier (₹ range or value vs premium)
-* Distribution Channels (retail, q-commerce, D2C, marketplaces)
-* Digital Presence (traffic source mix – inferred if needed)
-* Marketing Messaging (themes, tone)
-* Differentiators / Innovations
-
-Step 3 | Market & Category Insights
-* Key trends and consumer behaviors (reasonable inferences are fine).
-* Market trajectory (growing / maturing / fragmented).
-* 3 whitespace areas where players underperform.
-
-Step 4 | Strategic Implications for the Startup
-* Opportunities and threats.
-* Potential differentiation levers (tone, channels, partnerships).
-* Recommended price & distribution strategy.
-* Early creative tone suggestion.
-
-### Output Formatting (Text only)
-Return clean Markdown with headings, bullets, and one summary table. No code blocks.
-"""
-
-MR_PROMPT_TEMPLATE = """
-You are a Brand Positioning & Targeting Strategist.
-
----
-### Step 1 | Input Recap
-Summarize from context (reasonable inferences allowed):
-- Product Context
-- Geography
-- Model
-- Budget (Monthly Marketing) – mark ASSUMED if inferred
-- Target segments (2–3 prioritized)
-- Competitor set (3–5)
-- Category drivers (3–5)
-
----
-### Step 2 | Audience Refinement (Text only)
-For each target segment:
-• Audience DNA: demographics, top interests, negative audiences  
-• Estimated CPM/CPC, CTR, CVR (mark **ASSUMED** if inferred)  
-• Summary:
-  - Audience DNA paragraph
-  - Top 5 interests/keywords
-  - Estimated Reach, CPM (₹), CPC (₹), Channels
-
-Restrict at Step 2 in this response. Do not ask questions at the end.
-"""
+# Prompt templates and output cleanup live in pipeline.py (shared with batch.py).
 
 # --- State -----------------------------------------------------------------
 
@@ -558,6 +440,7 @@ PAGE_NAMES = {
     "Segment View": "page_a",
     "Target Lens": "page_b",
     "Market Radar": "page_c",
+    "Compare": "page_f",
     "Roadmap": "page_d",
     "Pricing": "page_e",
 }
@@ -570,12 +453,53 @@ if 'startup_launch_plan' not in st.session_state:
     st.session_state.startup_launch_plan = None
 if 'generating' not in st.session_state:
     st.session_state.generating = False
-if 'segmentation_output' not in st.session_state:
-    st.session_state.segmentation_output = None
-if 'target_lens_output' not in st.session_state:
-    st.session_state.target_lens_output = None
-if 'market_radar_output' not in st.session_state:
-    st.session_state.market_radar_output = None
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'output_refs' not in st.session_state:
+    # stage -> key of its output in the shared ReportStore (see get_output)
+    st.session_state.output_refs = {}
+if 'stage_hashes' not in st.session_state:
+    st.session_state.stage_hashes = {}
+if 'regenerate_stages' not in st.session_state:
+    st.session_state.regenerate_stages = ()
+if 'similar_match' not in st.session_state:
+    st.session_state.similar_match = None
+if 'similar_source' not in st.session_state:
+    # match score while the outputs are a reused analysis of a similar idea
+    st.session_state.similar_source = None
+if 'input_summary_html' not in st.session_state:
+    st.session_state.input_summary_html = ""
+if 'compare_variants' not in st.session_state:
+    # [{"idea", "launch_plan", "summary_html", "refs": {stage: store key}}]
+    st.session_state.compare_variants = []
+if 'compare_run' not in st.session_state:
+    # {"future", "events"} of the comparison being generated (see start_comparison);
+    # kept across reruns so an interrupted page re-attaches instead of starting over
+    st.session_state.compare_run = None
+
+# --- Report storage --------------------------------------------------------
+
+@st.cache_resource
+def get_report_store():
+    """Process-wide store for report text; sessions only keep keys into it."""
+    # looked up at call time: the hook is defined with the similarity index below
+    return ReportStore(on_evict=lambda holder_id: forget_similar_analysis(holder_id))
+
+get_report_store().touch(st.session_state.session_id)
+get_report_store().maybe_sweep()
+
+def get_output(stage):
+    """A stage's output text, or None if never generated or freed from memory."""
+    return get_report_store().get(st.session_state.output_refs.get(stage))
+
+def has_output(stage):
+    return st.session_state.output_refs.get(stage) in get_report_store()
+
+def set_output(stage, text):
+    if text:
+        st.session_state.output_refs[stage] = get_report_store().put(st.session_state.session_id, stage, text)
+    else:
+        st.session_state.output_refs.pop(stage, None)
 
 # --- Navigation ------------------------------------------------------------
 
@@ -586,7 +510,7 @@ def create_main_navbar():
     # Full-width nav bar
     st.markdown('<div class="apple-nav-container"><div class="apple-nav-inner">', unsafe_allow_html=True)
 
-    cols = st.columns([1,1,1,1,1,1])
+    cols = st.columns([1] * len(PAGE_NAMES))
     page_keys = list(PAGE_NAMES.keys())
     page_vals = list(PAGE_NAMES.values())
 
@@ -606,12 +530,9 @@ def get_segmentation_output(idea, launch_plan):
     if not GEMINI_ENABLED:
         return "Error: Gemini API is not configured. Please check your API key."
 
-    model = genai.GenerativeModel("gemini-2.5-flash-preview-09-2025")
-    prompt = SEGMENTATION_PROMPT_TEMPLATE.format(idea=idea, launch_plan=launch_plan)
+    prompt = segmentation_prompt(idea, launch_plan)
     try:
-        resp = model.generate_content(prompt)
-        text = resp.text or ""
-        return clean_model_markdown(text)
+        return generate_text_hedged(prompt, "segmentation")
     except Exception as e:
         st.error(f"An error occurred while calling the Gemini API: {e}")
         return f"Error: Could not generate content. {e}"
@@ -619,11 +540,9 @@ def get_segmentation_output(idea, launch_plan):
 def get_target_lens_output(segmentation_data: str):
     if not GEMINI_ENABLED:
         return "Error: Gemini API is not configured. Please check your API key."
-    model = genai.GenerativeModel("gemini-2.5-flash-preview-09-2025")
-    prompt = TL_PROMPT_TEMPLATE.format(segmentation_data=segmentation_data)
+    prompt = target_lens_prompt(segmentation_data)
     try:
-        resp = model.generate_content(prompt)
-        return clean_model_markdown(resp.text or "")
+        return generate_text_hedged(prompt, "target_lens")
     except Exception as e:
         st.error(f"An error occurred while calling the Gemini API: {e}")
         return f"Error: Could not generate content. {e}"
@@ -631,15 +550,336 @@ def get_target_lens_output(segmentation_data: str):
 def get_market_radar_output(segmentation_data: str):
     if not GEMINI_ENABLED:
         return "Error: Gemini API is not configured. Please check your API key."
-    model = genai.GenerativeModel("gemini-2.5-flash-preview-09-2025")
-    prompt = MR_PROMPT_TEMPLATE.format(segmentation_data=segmentation_data)
+    prompt = market_radar_prompt(segmentation_data)
     try:
-        resp = model.generate_content(prompt)
-        return clean_model_markdown(resp.text or "")
+        return generate_text_hedged(prompt, "market_radar")
     except Exception as e:
         st.error(f"An error occurred while calling the Gemini API for Market Radar: {e}")
         return f"Error: Could not generate Market Radar content. {e}"
 
+# --- Stage generation ------------------------------------------------------
+
+def stage_values():
+    """Inputs and current outputs keyed by stage-graph name (see pipeline.STAGES)."""
+    values = {"idea": st.session_state.startup_idea, "launch_plan": st.session_state.startup_launch_plan}
+    for stage in STAGE_ORDER:
+        values[stage] = get_output(stage)
+    return values
+
+STAGE_GENERATORS = {
+    "segmentation": lambda v: get_segmentation_output(v["idea"], v["launch_plan"]),
+    "target_lens": lambda v: get_target_lens_output(v["segmentation"]),
+    "market_radar": lambda v: get_market_radar_output(v["segmentation"]),
+}
+
+STAGE_PROGRESS = {
+    "segmentation": "Generating Market Segmentation...",
+    "target_lens": "Generating Competitive Analysis...",
+    "market_radar": "Generating Positioning Strategy...",
+}
+
+INPUT_SUMMARY_TEMPLATE = """
+<div class="input-summary-section">
+    <h3>Startup Idea</h3>
+    <p>"{idea}"</p>
+    <h3 style="margin-top: 1rem;">Launch Plan</h3>
+    <p>"{launch_plan}"</p>
+</div>
+"""
+
+def input_summary_html(idea, launch_plan):
+    return INPUT_SUMMARY_TEMPLATE.format(idea=html.escape(idea), launch_plan=html.escape(launch_plan))
+
+def set_inputs(idea, launch_plan):
+    """Store the form inputs, escaping them once for the summary block."""
+    st.session_state.startup_idea = idea
+    st.session_state.startup_launch_plan = launch_plan
+    st.session_state.input_summary_html = input_summary_html(idea, launch_plan)
+
+def stored_html(ref, slot):
+    """Sanitized HTML for the stored text `ref`, converted at most once per distinct text."""
+    if not ref:
+        return ""
+    store = get_report_store()
+    html_key = f"html:{ref}"
+    rendered = cached_html(html_key, store.get, lambda: store.get(ref) or "")
+    # stored next to the text; rebinding the slot frees the HTML of a replaced output
+    store.put(st.session_state.session_id, f"{slot}:html", rendered, key=html_key)
+    return rendered
+
+def report_html(stage):
+    return stored_html(st.session_state.output_refs.get(stage), stage)
+
+def prerender_outputs():
+    """Convert the current stage outputs to HTML once, right after they are generated."""
+    for stage in STAGE_ORDER:
+        report_html(stage)
+
+def request_regeneration(*stages):
+    """Queue a rerun of `stages`; dependents rerun only if their inputs change."""
+    st.session_state.regenerate_stages = tuple(stages)
+    st.session_state.generating = True
+
+def run_pending_generation():
+    """Run only the stages whose inputs changed (or that were explicitly requested)."""
+    if not st.session_state.generating:
+        return
+    values = stage_values()
+    # refreshed on a copy: a rerun can stop the script at any st.* call, and a
+    # hash must never be saved without the output it was generated for
+    hashes = dict(st.session_state.stage_hashes)
+
+    def on_stage(stage):
+        st.write(f"Step {STAGE_ORDER.index(stage) + 1}/{len(STAGE_ORDER)}: {STAGE_PROGRESS[stage]}")
+
+    def on_stage_done(stage):
+        set_output(stage, values[stage])
+        st.session_state.stage_hashes = dict(hashes)
+        if stage == "segmentation":
+            st.session_state.similar_source = None
+
+    with st.spinner("Generating Brand Strategy..."):
+        ran = refresh_stages(
+            values,
+            hashes,
+            lambda stage, v: STAGE_GENERATORS[stage](v),
+            force=st.session_state.regenerate_stages,
+            on_stage=on_stage,
+            on_stage_done=on_stage_done,
+        )
+        prerender_outputs()
+
+        if "segmentation" in ran and values["segmentation"].startswith("Error:"):
+            st.error("Error during Step 1: Segmentation. Halting generation.")
+        elif ran:
+            st.write("Generation complete!")
+            if not any(values[stage].startswith("Error:") for stage in STAGE_ORDER):
+                remember_analysis(values)
+        else:
+            st.write("Inputs unchanged. Showing your saved analysis.")
+    st.session_state.regenerate_stages = ()
+    st.session_state.generating = False
+
+# --- Similar analyses ------------------------------------------------------
+
+# word overlap of the ideas / launch plans above which a past analysis is
+# offered instead of generating (see similarity.SimilarityIndex)
+SIMILARITY_THRESHOLD = 0.76
+SIMILARITY_PLAN_THRESHOLD = 0.5
+
+# Each remembered analysis is its own ReportStore holder, so idle ones are
+# evicted like idle sessions; the index also keeps at most this many.
+MAX_REMEMBERED_ANALYSES = 2000
+SIMILARITY_HOLDER_PREFIX = "similar:"
+
+def similarity_holder(key):
+    return SIMILARITY_HOLDER_PREFIX + key
+
+@st.cache_resource
+def get_similarity_index():
+    """Process-wide index of completed analyses, shared by all sessions."""
+    return SimilarityIndex(
+        threshold=SIMILARITY_THRESHOLD,
+        plan_threshold=SIMILARITY_PLAN_THRESHOLD,
+        max_entries=MAX_REMEMBERED_ANALYSES,
+        on_evict=lambda key, payload: get_report_store().release(similarity_holder(key)),
+    )
+
+def forget_similar_analysis(holder_id):
+    """ReportStore eviction hook: drop the index entry whose reports were just freed."""
+    if holder_id.startswith(SIMILARITY_HOLDER_PREFIX):
+        get_similarity_index().remove(holder_id[len(SIMILARITY_HOLDER_PREFIX):])
+
+def remember_analysis(values):
+    store = get_report_store()
+    key = input_key(values["idea"], values["launch_plan"])
+    payload = {
+        "idea": values["idea"],
+        "launch_plan": values["launch_plan"],
+        "refs": {stage: store.put(similarity_holder(key), stage, values[stage]) for stage in STAGE_ORDER},
+    }
+    get_similarity_index().add(values["idea"], values["launch_plan"], payload, key=key)
+
+def find_similar_analysis(idea, launch_plan):
+    """
+    Best remembered analysis for these inputs as (score, payload), or None.
+    Entries whose reports have been freed are dropped from the index.
+    """
+    store, index = get_report_store(), get_similarity_index()
+    while True:
+        match = index.lookup(idea, launch_plan)
+        if match is None:
+            return None
+        key = input_key(match[1]["idea"], match[1]["launch_plan"])
+        if all(ref in store for ref in match[1]["refs"].values()):
+            store.touch(similarity_holder(key))
+            return match
+        index.remove(key)
+
+def use_similar_analysis(score, payload):
+    """
+    Show a past analysis for the current inputs without any model calls.
+    Returns False if it has since been replaced in the store.
+
+    The session keeps the inputs the user typed; the reused reports are
+    labelled as coming from a similar idea (see show_input_summary) and hashed
+    against those inputs, so regenerating one stage reruns only that stage.
+    """
+    store = get_report_store()
+    if not all(ref in store for ref in payload["refs"].values()):
+        return False
+    for stage, ref in payload["refs"].items():
+        if not store.bind(st.session_state.session_id, stage, ref):
+            return False
+        st.session_state.output_refs[stage] = ref
+    values = stage_values()
+    st.session_state.stage_hashes = {stage: stage_hash(stage, values) for stage in STAGE_ORDER}
+    st.session_state.similar_source = score
+    prerender_outputs()
+    return True
+
+def show_input_summary():
+    st.html(st.session_state.input_summary_html)
+    if st.session_state.similar_source is not None:
+        st.caption(
+            f"This analysis was written for a very similar idea ({st.session_state.similar_source:.0%} match) "
+            "and reused without calling the model. Regenerate Segment View for one based on your exact inputs."
+        )
+
+def regenerate_button(stage, label):
+    if st.button(label, key=f"regen_{stage}", disabled=not GEMINI_ENABLED or st.session_state.generating):
+        request_regeneration(stage)
+        st.rerun()
+
+# --- Comparison ------------------------------------------------------------
+
+MAX_VARIANTS = 5
+
+def compare_slot(index, stage):
+    return f"compare:{index}:{stage}"
+
+def start_comparison(entries):
+    """
+    Replace the current comparison with `entries` and fan every variant out on
+    the shared background loop. Identical stage inputs across variants are
+    generated once (see pipeline.run_variants_async).
+    """
+    store = get_report_store()
+    for i in range(MAX_VARIANTS):
+        for stage in STAGE_ORDER:
+            store.unbind(st.session_state.session_id, compare_slot(i, stage))
+            store.unbind(st.session_state.session_id, compare_slot(i, stage) + ":html")
+    st.session_state.compare_variants = [
+        {"idea": idea, "launch_plan": plan, "summary_html": input_summary_html(idea, plan), "refs": {}}
+        for idea, plan in entries
+    ]
+    events = queue.Queue()
+    st.session_state.compare_run = {
+        "events": events,
+        "future": submit(run_variants_async(
+            entries, on_stage_done=lambda i, stage, text: events.put((i, stage, text))
+        )),
+    }
+
+def compare_section_html(stage, body):
+    return (
+        f'<div class="brand-output-section"><h2>{STAGE_LABELS[stage]}</h2>'
+        f'<div class="table-scroll">{body}</div></div>'
+    )
+
+def show_compare_section(placeholder, index, stage):
+    ref = st.session_state.compare_variants[index]["refs"].get(stage)
+    if ref in get_report_store():
+        placeholder.html(compare_section_html(stage, stored_html(ref, compare_slot(index, stage))))
+    elif st.session_state.compare_run is not None:
+        placeholder.info(f"Generating {STAGE_LABELS[stage]}...")
+    else:
+        placeholder.warning(f"{STAGE_LABELS[stage]} is no longer available. Please run the comparison again.")
+
+def follow_comparison(placeholders, status):
+    """
+    Fill each variant's placeholders as the running comparison's stages
+    finish. A rerun or page change only stops the following: the run keeps
+    going, its finished stages wait in the event queue, and the next visit
+    picks up from there.
+
+    Streamlit can only stop a script at an st.* call, so while waiting this
+    updates `status` about once a second; without that a click would take
+    effect only when the next stage finished.
+    """
+    run = st.session_state.compare_run
+    variants = st.session_state.compare_variants
+    total = len(variants) * len(STAGE_ORDER)
+    started, shown = time.monotonic(), None
+    while True:
+        ready = sum(len(v["refs"]) for v in variants)
+        elapsed = int(time.monotonic() - started)
+        if elapsed != shown:
+            status.caption(f"{ready} of {total} sections ready · {elapsed}s")
+            shown = elapsed
+        try:
+            i, stage, text = run["events"].get(timeout=0.25)
+        except queue.Empty:
+            # every event is queued before the future completes
+            if run["future"].done() and run["events"].empty():
+                break
+            continue
+        variants[i]["refs"][stage] = get_report_store().put(
+            st.session_state.session_id, compare_slot(i, stage), text
+        )
+        show_compare_section(placeholders[i][stage], i, stage)
+    status.empty()
+    st.session_state.compare_run = None
+    try:
+        run["future"].result()
+    except Exception as e:
+        st.error(f"An error occurred while comparing variants: {e}")
+
+# --- Export ----------------------------------------------------------------
+
+def export_sections():
+    """The stored outputs as export sections, or None if any is missing or was freed."""
+    store = get_report_store()
+    sections = []
+    for stage in STAGE_ORDER:
+        ref = st.session_state.output_refs.get(stage)
+        if ref not in store:
+            return None
+        sections.append(Section(
+            STAGE_LABELS[stage],
+            ref,
+            lambda ref=ref: store.get(ref) or "",
+            lambda ref=ref, stage=stage: stored_html(ref, stage),
+        ))
+    return sections
+
+def export_controls(page):
+    """Download the full report from what is already stored; never calls the model."""
+    if st.session_state.generating:
+        return
+    st.markdown("### Export Full Report")
+    sections = export_sections()
+    if sections is None:
+        st.caption("Generate all three analyses to export them together.")
+        return
+    fmt = st.radio("Format", list(FORMATS), horizontal=True, key=f"export_format_{page}")
+    extension, mime = FORMATS[fmt]
+    inputs = [("Startup Idea", st.session_state.startup_idea), ("Launch Plan", st.session_state.startup_launch_plan)]
+    if st.session_state.similar_source is not None:
+        inputs.append(("Note", f"Analysis reused from a very similar idea ({st.session_state.similar_source:.0%} match)"))
+    try:
+        data = build_export(fmt, "StartWise Report", sections, inputs, logo_base64 or "")
+    except Exception as e:
+        st.error(f"Could not build the {fmt} export: {e}")
+        return
+    st.download_button(
+        f"Download {fmt}",
+        data=data,
+        file_name=f"startwise-report-{input_key(st.session_state.startup_idea, st.session_state.startup_launch_plan)}.{extension}",
+        mime=mime,
+        key=f"export_download_{page}",
+    )
+
 # --- Pages -----------------------------------------------------------------
 
 def main_page():
@@ -673,65 +913,53 @@ def main_page():
             if not idea or not launch_plan:
                 st.error("Please fill out both fields to generate your brand identity.")
             else:
-                st.session_state.startup_idea = idea
-                st.session_state.startup_launch_plan = launch_plan
-                st.session_state.generating = True
-                st.session_state.segmentation_output = None
-                st.session_state.target_lens_output = None
-                st.session_state.market_radar_output = None
-                navigate_to(PAGE_NAMES["Segment View"])
+                # outputs are kept: run_pending_generation() only reruns the
+                # stages whose inputs actually changed
+                set_inputs(idea, launch_plan)
+                match = find_similar_analysis(idea, launch_plan)
+                if match and match[1]["refs"]["segmentation"] != st.session_state.output_refs.get("segmentation"):
+                    # offer the near-duplicate before paying for generation
+                    st.session_state.similar_match = match
+                else:
+                    request_regeneration()
+                    navigate_to(PAGE_NAMES["Segment View"])
                 st.rerun()
 
+    if st.session_state.similar_match:
+        score, payload = st.session_state.similar_match
+        # the index is shared by every session: say how close the match is, never whose idea it was
+        st.info(f"We already have an analysis for a very similar idea ({score:.0%} match).")
+        col_use, col_new = st.columns(2)
+        with col_use:
+            if st.button("View similar analysis", key="use_similar"):
+                if not use_similar_analysis(score, payload):
+                    request_regeneration()
+                st.session_state.similar_match = None
+                navigate_to(PAGE_NAMES["Segment View"]); st.rerun()
+        with col_new:
+            if st.button("Generate a fresh analysis", key="skip_similar", disabled=not GEMINI_ENABLED):
+                st.session_state.similar_match = None
+                request_regeneration()
+                navigate_to(PAGE_NAMES["Segment View"]); st.rerun()
+
 def page_a():
     create_main_navbar()
     if st.session_state.startup_idea and st.session_state.startup_launch_plan:
         st.markdown('<h1 class="apple-page-title">Segment View</h1>', unsafe_allow_html=True)
-        st.markdown(f"""
-        <div class="input-summary-section">
-            <h3>Startup Idea</h3>
-            <p>"{st.session_state.startup_idea}"</p>
-            <h3 style="margin-top: 1rem;">Launch Plan</h3>
-            <p>"{st.session_state.startup_launch_plan}"</p>
-        </div>
-        """, unsafe_allow_html=True)
+        show_input_summary()
 
         output_placeholder = st.empty()
 
-        if st.session_state.generating:
-            with st.spinner("Generating Brand Strategy (3 steps)..."):
-                st.write("Step 1/3: Generating Market Segmentation...")
-                seg = get_segmentation_output(st.session_state.startup_idea, st.session_state.startup_launch_plan)
-                st.session_state.segmentation_output = seg
+        run_pending_generation()
 
-                if seg and not seg.startswith("Error:"):
-                    st.write("Step 2/3: Generating Competitive Analysis...")
-                    tl = get_target_lens_output(seg)
-                    st.session_state.target_lens_output = tl
-
-                    st.write("Step 3/3: Generating Positioning Strategy...")
-                    mr = get_market_radar_output(seg)
-                    st.session_state.market_radar_output = mr
-
-                    st.write("Generation complete!")
-                else:
-                    st.error("Error during Step 1: Segmentation. Halting generation.")
-                    st.session_state.target_lens_output = "Error: Could not generate Target Lens because Segmentation failed."
-                    st.session_state.market_radar_output = "Error: Could not generate Market Radar because Segmentation failed."
-                st.session_state.generating = False
-
-        if st.session_state.segmentation_output:
-            output_placeholder.markdown(
-                f'''
-                <div class="brand-output-section">
-                    <div class="table-scroll">
-                        {st.session_state.segmentation_output}
-                    </div>
-                </div>
-                ''',
-                unsafe_allow_html=True
+        if has_output("segmentation"):
+            output_placeholder.html(
+                f'<div class="brand-output-section"><div class="table-scroll">{report_html("segmentation")}</div></div>'
             )
         elif not st.session_state.generating:
             output_placeholder.error("There was an issue generating the segmentation output.")
+        regenerate_button("segmentation", "Regenerate Segment View")
+        export_controls("segmentation")
     else:
         st.markdown('<h1 class="apple-page-title">Segment View</h1>', unsafe_allow_html=True)
         st.markdown("## Understand Your Market Segments.")
@@ -745,33 +973,21 @@ def page_b():
     st.markdown('<h1 class="apple-page-title">Target Lens</h1>', unsafe_allow_html=True)
 
     if st.session_state.startup_idea and st.session_state.startup_launch_plan:
-        st.markdown(f"""
-        <div class="input-summary-section">
-            <h3>Startup Idea</h3>
-            <p>"{st.session_state.startup_idea}"</p>
-            <h3 style="margin-top: 1rem;">Launch Plan</h3>
-            <p>"{st.session_state.startup_launch_plan}"</p>
-        </div>
-        """, unsafe_allow_html=True)
+        show_input_summary()
 
         output_placeholder = st.empty()
+        run_pending_generation()
 
-        if st.session_state.target_lens_output:
-            text_output = st.session_state.target_lens_output
-            output_placeholder.markdown(
-                f'''
-                <div class="brand-output-section">
-                    <div class="table-scroll">
-                        {text_output}
-                    </div>
-                </div>
-                ''',
-                unsafe_allow_html=True
+        if has_output("target_lens"):
+            output_placeholder.html(
+                f'<div class="brand-output-section"><div class="table-scroll">{report_html("target_lens")}</div></div>'
             )
         elif st.session_state.generating:
             output_placeholder.info("Your analysis is being generated. Please wait...")
         else:
             output_placeholder.warning("Could not find generated analysis. Please try submitting the form again from the Home page.")
+        regenerate_button("target_lens", "Regenerate Target Lens")
+        export_controls("target_lens")
     else:
         st.markdown("## Analyze Your Competition.")
         st.markdown(
@@ -784,25 +1000,19 @@ def page_c():
     st.markdown('<h1 class="apple-page-title">Market Radar</h1>', unsafe_allow_html=True)
 
     if st.session_state.startup_idea and st.session_state.startup_launch_plan:
-        st.markdown(f"""
-        <div class="input-summary-section">
-            <h3>Startup Idea</h3>
-            <p>"{st.session_state.startup_idea}"</p>
-            <h3 style="margin-top: 1rem;">Launch Plan</h3>
-            <p>"{st.session_state.startup_launch_plan}"</p>
-        </div>
-        """, unsafe_allow_html=True)
+        show_input_summary()
 
         output_placeholder = st.empty()
-        if st.session_state.market_radar_output:
-            output_placeholder.markdown(
-                f'<div class="brand-output-section">{st.session_state.market_radar_output}</div>',
-                unsafe_allow_html=True
-            )
+        run_pending_generation()
+
+        if has_output("market_radar"):
+            output_placeholder.html(f'<div class="brand-output-section">{report_html("market_radar")}</div>')
         elif st.session_state.generating:
             output_placeholder.info("Your analysis is being generated. Please wait...")
         else:
             output_placeholder.warning("Could not find generated analysis. Please try submitting the form again from the Home page.")
+        regenerate_button("market_radar", "Regenerate Market Radar")
+        export_controls("market_radar")
     else:
         st.markdown("## Track Competitors and Trends.")
         st.markdown(
@@ -810,6 +1020,59 @@ def page_c():
             unsafe_allow_html=True
         )
 
+def page_f():
+    create_main_navbar()
+    st.markdown('<h1 class="apple-page-title">Compare</h1>', unsafe_allow_html=True)
+    st.markdown("## Compare Variants Side by Side.")
+
+    count = st.number_input("How many variants?", min_value=2, max_value=MAX_VARIANTS, value=2, key="compare_count")
+    with st.form(key="compare_form"):
+        entries = []
+        for i, col in enumerate(st.columns(count)):
+            with col:
+                idea = st.text_area(
+                    f"Variant {i + 1}: idea",
+                    value=(st.session_state.startup_idea or "") if i == 0 else "",
+                    key=f"compare_idea_{i}",
+                    height=100,
+                )
+                launch_plan = st.text_area(
+                    f"Variant {i + 1}: launch plan",
+                    value=(st.session_state.startup_launch_plan or "") if i == 0 else "",
+                    key=f"compare_plan_{i}",
+                    height=100,
+                )
+            entries.append((idea.strip(), launch_plan.strip()))
+
+        st.markdown('<div class="apple-primary-button-container" style="display: flex; justify-content: center;">', unsafe_allow_html=True)
+        submitted = st.form_submit_button("Compare", type="primary", disabled=not GEMINI_ENABLED or st.session_state.compare_run is not None)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        if submitted:
+            if not all(idea and launch_plan for idea, launch_plan in entries):
+                st.error("Please fill out the idea and launch plan for every variant.")
+            else:
+                start_comparison(entries)
+                st.rerun()
+
+    variants = st.session_state.compare_variants
+    if not variants:
+        return
+    placeholders = []
+    for i, col in enumerate(st.columns(len(variants))):
+        with col:
+            st.markdown(f"### Variant {i + 1}")
+            st.html(variants[i]["summary_html"])
+            slots = {stage: st.empty() for stage in STAGE_ORDER}
+            for stage, placeholder in slots.items():
+                show_compare_section(placeholder, i, stage)
+            placeholders.append(slots)
+
+    if st.session_state.compare_run is not None:
+        status = st.empty()
+        with st.spinner(f"Generating {len(variants)} variants..."):
+            follow_comparison(placeholders, status)
+
 def page_d():
     create_main_navbar()
     st.markdown('<h1 class="apple-page-title">Roadmap</h1>', unsafe_allow_html=True)
@@ -836,6 +1099,80 @@ def page_e():
         unsafe_allow_html=True,
     )
 
+def ops_page():
+    """Operator view, opened with `?view=ops`. Metrics are per replica."""
+    st.markdown('<h1 class="apple-page-title">Operations</h1>', unsafe_allow_html=True)
+
+    st.markdown("### Model latency and hedging")
+    fmt = lambda v: "–" if v is None else f"{v:.2f}s"
+    st.table([
+        {
+            "Stage": STAGE_LABELS[stage],
+            "Calls": m["calls"],
+            "Hedged": m["hedged"],
+            "Hedge wins": m["hedge_wins"],
+            "Hedges skipped": m["hedges_skipped"],
+            "Failures": m["failures"],
+            "Extra calls": f"{m['extra_call_rate']:.1%}",
+            "p50": fmt(m["p50"]),
+            "p95": fmt(m["p95"]),
+            "p99": fmt(m["p99"]),
+            "p99 unhedged ≥": fmt(m["p99_unhedged"]),
+            "Time saved ≥": fmt(m["saved"]),
+            "Hedge after": fmt(m["hedge_delay"]),
+        }
+        for stage, m in DEFAULT_HEDGE_POLICY.summary().items()
+    ])
+    st.caption(
+        "A backup request is sent when a stage has not streamed its first token within "
+        "the \"Hedge after\" delay, if the rate limiter has a free slot for it (otherwise it "
+        "counts as skipped). Hedge wins are calls where the backup answered first. The cancelled "
+        "primary's full latency is unknown, so time saved and the unhedged p99 are lower bounds."
+    )
+
+    st.markdown("### Session memory")
+    report = get_report_store().memory_report()
+    mb = lambda n: f"{n / 1024 / 1024:.2f} MB"
+    remembered = sum(1 for hid in report["per_holder"] if hid.startswith(SIMILARITY_HOLDER_PREFIX))
+    st.table([{
+        "Sessions": report["holders"] - remembered,
+        "Remembered analyses": remembered,
+        "Stored blobs": report["blobs"],
+        "Uncompressed (hot)": report["hot_blobs"],
+        "Resident": mb(report["resident_bytes"]),
+        "Without compression": mb(report["uncompressed_bytes"]),
+        "Budget": mb(report["budget_bytes"]),
+        "Evicted holders": report["evicted_holders"],
+        "This session": f"{report['per_holder'].get(st.session_state.session_id, 0) / 1024:.1f} KB",
+    }])
+    st.markdown("#### Biggest holders")
+    st.table([
+        {
+            "Holder": h["holder"][:16],
+            "Bytes": f"{h['bytes'] / 1024:.1f} KB",
+            "Slots": h["slots"],
+            "Idle": f"{h['idle_s']}s",
+        }
+        for h in report["top"]
+    ])
+
+    st.markdown("#### Export cache")
+    exports = cache_stats()
+    st.table([{
+        "Cached downloads": exports["artifacts"],
+        "Size": mb(exports["bytes"]),
+        "Limit": mb(exports["max_bytes"]),
+    }])
+
+    st.markdown("### Report rendering")
+    conversions = RENDER_STATS["conversions"]
+    avg_ms = 1000 * RENDER_STATS["convert_seconds"] / conversions if conversions else 0.0
+    st.table([{
+        "Markdown conversions": conversions,
+        "Avg conversion": f"{avg_ms:.1f} ms",
+        "Served from cache": RENDER_STATS["cache_hits"],
+    }])
+
 # --- Router ----------------------------------------------------------------
 
 page_functions = {
@@ -843,7 +1180,11 @@ page_functions = {
     PAGE_NAMES["Segment View"]: page_a,
     PAGE_NAMES["Target Lens"]: page_b,
     PAGE_NAMES["Market Radar"]: page_c,
+    PAGE_NAMES["Compare"]: page_f,
     PAGE_NAMES["Roadmap"]: page_d,
     PAGE_NAMES["Pricing"]: page_e,
 }
-page_functions[st.session_state.current_page]()
+if st.query_params.get("view") == "ops":
+    ops_page()
+else:
+    page_functions[st.session_state.current_page]()
@@ -0,0 +1,153 @@
+"""
+Headless batch runner: generate StartWise reports for many ideas at once.
+
+Reads (idea, launch_plan) rows from a CSV or JSONL file and runs the
+segmentation -> target lens -> market radar chain for each, with bounded
+concurrency under the API rate limit. Each finished row is appended to the
+output JSONL immediately, so the output file doubles as the checkpoint:
+re-running with the same output path skips rows that already succeeded.
+
+    python batch.py ideas.csv -o reports.jsonl --concurrency 8 --rpm 120
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+
+from pipeline import DEFAULT_HEDGE_POLICY, RateLimiter, configure_gemini, input_key, run_chain_async
+
+# --- Input / checkpoint ----------------------------------------------------
+
+def read_rows(path):
+    """Yield dicts with `id`, `idea`, `launch_plan` from a .csv or .jsonl file."""
+    # utf-8-sig: CSVs saved from Excel start with a BOM that would otherwise
+    # end up in the first header ("\ufeffidea")
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.lower().endswith(".csv"):
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        for rec in records:
+            idea = (rec.get("idea") or "").strip()
+            launch_plan = (rec.get("launch_plan") or "").strip()
+            if not idea or not launch_plan:
+                print(f"Skipping row without idea/launch_plan: {rec}", file=sys.stderr)
+                continue
+            yield {
+                "id": str(rec.get("id") or input_key(idea, launch_plan)),
+                "idea": idea,
+                "launch_plan": launch_plan,
+            }
+
+def load_completed(output_path):
+    """Ids already written successfully to `output_path` (the checkpoint)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                # a partially written last line from an interrupted run
+                continue
+            if rec.get("status") == "ok":
+                done.add(rec["id"])
+    return done
+
+def _status(result):
+    failed = any((v or "").startswith("Error:") for v in result.values())
+    return "error" if failed else "ok"
+
+# --- Runner ----------------------------------------------------------------
+
+async def run_batch(rows, output_path, concurrency=4, requests_per_minute=60.0, done=frozenset()):
+    """
+    Generate every row in `rows` (any iterable, e.g. `read_rows(...)`) with
+    `concurrency` workers. Rows whose id is in `done` or was already seen are
+    counted and skipped. Rows are pulled through a small queue, so only a
+    handful are in memory at a time; only the ids seen so far are kept.
+    """
+    limiter = RateLimiter(max_concurrency=concurrency, requests_per_minute=requests_per_minute)
+    pending = asyncio.Queue(maxsize=concurrency * 2)
+    counts = {"ok": 0, "error": 0, "skipped": 0, "duplicates": 0}
+
+    with open(output_path, "a", encoding="utf-8") as out:
+
+        async def worker():
+            while True:
+                row = await pending.get()
+                if row is None:
+                    return
+                started = time.monotonic()
+                result = await run_chain_async(row["idea"], row["launch_plan"], limiter)
+                status = _status(result)
+                counts[status] += 1
+                record = {**row, **result, "status": status, "elapsed_s": round(time.monotonic() - started, 2)}
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                print(f"[{status}] {row['id']} ({record['elapsed_s']}s)", file=sys.stderr)
+
+        async def feed():
+            seen = set()
+            for row in rows:
+                if row["id"] in done:
+                    counts["skipped"] += 1
+                elif row["id"] in seen:
+                    counts["duplicates"] += 1
+                else:
+                    seen.add(row["id"])
+                    await pending.put(row)
+            for _ in range(concurrency):
+                await pending.put(None)
+
+        tasks = [asyncio.create_task(feed())] + [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # if a worker died, don't leave the feeder blocked on a full queue
+            for t in tasks:
+                t.cancel()
+
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate StartWise reports for many ideas.")
+    parser.add_argument("input", help="CSV or JSONL file with `idea` and `launch_plan` (optional `id`)")
+    parser.add_argument("-o", "--output", default="reports.jsonl", help="JSONL output / checkpoint file")
+    parser.add_argument("--concurrency", type=int, default=4, help="max concurrent model calls")
+    parser.add_argument("--rpm", type=float, default=60.0, help="max model requests per minute")
+    args = parser.parse_args(argv)
+
+    try:
+        configure_gemini()
+    except Exception as e:
+        print(f"Error configuring Gemini API: {e}. Please check the API key.", file=sys.stderr)
+        return 1
+
+    counts = asyncio.run(run_batch(
+        read_rows(args.input), args.output, args.concurrency, args.rpm, done=load_completed(args.output)
+    ))
+    if not any(counts.values()):
+        print(f"No rows with `idea` and `launch_plan` found in {args.input}.", file=sys.stderr)
+        return 1
+    print(
+        f"Finished: {counts['ok']} ok, {counts['error']} failed, "
+        f"{counts['skipped']} already done, {counts['duplicates']} duplicates.",
+        file=sys.stderr,
+    )
+    for stage, m in DEFAULT_HEDGE_POLICY.summary().items():
+        if m["p50"] is not None:
+            print(
+                f"  {stage}: {m['calls']} calls, {m['hedged']} hedged ({m['hedge_wins']} won, "
+                f"{m['hedges_skipped']} skipped), p50 {m['p50']:.1f}s, p99 {m['p99']:.1f}s "
+                f"(unhedged >= {m['p99_unhedged']:.1f}s), >= {m['saved']:.1f}s saved",
+                file=sys.stderr,
+            )
+    return 0 if counts["error"] == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""
+Combined report export (Markdown, standalone HTML, PDF) from stored outputs.
+
+Nothing here calls the model: sections are read from what was already
+generated. Every artifact is built whole in memory, because the download
+button needs the complete bytes. Finished artifacts are kept in a small
+process-wide LRU cache keyed by the content hashes of their sections (see
+`cache_stats`).
+"""
+import base64
+import hashlib
+import html
+import io
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from fpdf import FPDF
+
+# `key` is the content hash of the section text; `text` / `html` load it lazily
+# so a cached artifact never touches the stored report.
+Section = namedtuple("Section", ["title", "key", "text", "html"])
+
+FORMATS = {
+    "Markdown": ("md", "text/markdown"),
+    "HTML": ("html", "text/html"),
+    "PDF": ("pdf", "application/pdf"),
+}
+
+# --- Markdown / HTML -------------------------------------------------------
+
+def markdown_chunks(title, sections, inputs):
+    yield f"# {title}\n\n"
+    for label, value in inputs:
+        yield f"**{label}:** {value}\n\n"
+    for section in sections:
+        yield f"---\n\n## {section.title}\n\n"
+        yield section.text()
+        yield "\n\n"
+
+EXPORT_CSS = """
+body { font-family: 'Inter', -apple-system, 'Segoe UI', sans-serif; color: #333333; max-width: 960px; margin: 2rem auto; padding: 0 1.5rem; line-height: 1.6; }
+header { display: flex; align-items: center; gap: 1rem; border-bottom: 2px solid #0A2351; padding-bottom: 1rem; }
+header img { width: 64px; height: 64px; border-radius: 12px; }
+header h1 { color: #0A2351; margin: 0; }
+.inputs { background: #F8F8F8; border: 1px solid #E0E0E0; border-radius: 12px; padding: 1rem 1.5rem; margin: 1.5rem 0; }
+section { border: 1px solid #E0E0E0; border-radius: 12px; padding: 1.5rem 2rem; margin-top: 2rem; page-break-inside: auto; }
+section > h2 { color: #0A2351; border-bottom: 1px solid #E0E0E0; padding-bottom: 0.5rem; }
+table { border-collapse: collapse; width: 100%; margin: 1rem 0; }
+th, td { border: 1px solid #E0E0E0; padding: 0.5rem 0.75rem; vertical-align: top; text-align: left; }
+th { background: #F8F8F8; }
+"""
+
+def html_chunks(title, sections, inputs, logo_data_uri=""):
+    """Standalone page; the logo is embedded once, in the header."""
+    yield (
+        "<!DOCTYPE html>\n<html lang=\"en\"><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title><style>{EXPORT_CSS}</style></head><body>\n<header>"
+    )
+    if logo_data_uri:
+        yield f'<img src="{logo_data_uri}" alt="StartWise Logo">'
+    yield f"<h1>{html.escape(title)}</h1></header>\n<div class=\"inputs\">"
+    for label, value in inputs:
+        yield f"<p><strong>{html.escape(label)}:</strong> {html.escape(value)}</p>"
+    yield "</div>\n"
+    for section in sections:
+        yield f"<section><h2>{html.escape(section.title)}</h2>\n"
+        yield section.html()
+        yield "</section>\n"
+    yield "</body></html>\n"
+
+# --- PDF -------------------------------------------------------------------
+
+# Unicode fonts to try; without one we fall back to Helvetica (latin-1 only)
+PDF_FONT_CANDIDATES = (
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/Library/Fonts/Arial Unicode.ttf", None),
+    ("C:\\Windows\\Fonts\\arial.ttf", "C:\\Windows\\Fonts\\arialbd.ttf"),
+)
+_LATIN1_REPLACEMENTS = {
+    "₹": "Rs.", "–": "-", "—": "-", "‘": "'", "’": "'", "“": '"', "”": '"',
+    "•": "-", "…": "...", "≤": "<=", "≥": ">=", "→": "->",
+}
+
+class _ReportPDF(FPDF):
+    def __init__(self):
+        super().__init__(format="A4")
+        self.set_auto_page_break(auto=True, margin=15)
+        self.unicode = False
+        for regular, bold in PDF_FONT_CANDIDATES:
+            if os.path.exists(regular):
+                self.add_font("Report", "", regular)
+                self.add_font("Report", "B", bold if bold and os.path.exists(bold) else regular)
+                self.unicode = True
+                break
+        self.family = "Report" if self.unicode else "Helvetica"
+
+    def clean(self, text):
+        if self.unicode:
+            return text
+        for src, dst in _LATIN1_REPLACEMENTS.items():
+            text = text.replace(src, dst)
+        return text.encode("latin-1", "replace").decode("latin-1")
+
+    def block(self, h, text, **kwargs):
+        """A wrapped paragraph; the cursor moves to the left margin of the next line."""
+        self.multi_cell(0, h, self.clean(text), new_x="LMARGIN", new_y="NEXT", **kwargs)
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font(self.family, "", 8)
+        self.set_text_color(150, 150, 150)
+        self.cell(0, 8, f"{self.page_no()}", align="C")
+
+_TABLE_SEPARATOR = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+_BULLET = re.compile(r"^(\s*)([*\-•+]|\d+[.)])\s+(.*)$")
+
+def _inline(text):
+    """Model Markdown emphasis -> fpdf2's markdown subset (**bold** only)."""
+    text = re.sub(r"`([^`]*)`", r"\1", text)
+    text = re.sub(r"\[([^\]]+)\]\(([^)]+)\)", r"\1 (\2)", text)
+    text = re.sub(r"(?<![*\w])\*(?!\*)([^*]+)(?<!\*)\*(?![*\w])", r"\1", text)
+    return text
+
+def _markup(text):
+    """
+    `_inline` for a `markdown=True` block. fpdf2 reads __x__ as italic and
+    --x-- as underline, and the report font has no italic style. So GFM
+    __bold__ becomes **bold**, and any other "__" or "--" is escaped, along
+    with backslashes, so that it prints as written.
+    """
+    text = re.sub(r"(?<![\w_])__(?=\S)(.+?)(?<=\S)__(?![\w_])", r"**\1**", _inline(text))
+    text = text.replace("\\", "\\\\")
+    return re.sub(r"(__|--)", r"\\\1", text)
+
+def _cells(line):
+    return [cell.strip().replace("**", "") for cell in line.strip().strip("|").split("|")]
+
+def _pdf_table(pdf, rows):
+    if not rows:
+        return  # a "|" block with only separator lines
+    width = max(len(r) for r in rows)
+    rows = [r + [""] * (width - len(r)) for r in rows]
+    pdf.set_font(pdf.family, "", 8)
+    with pdf.table(first_row_as_headings=True, line_height=4.5, padding=1.5) as table:
+        for r in rows:
+            row = table.row()
+            for cell in r:
+                row.cell(pdf.clean(_inline(cell)))
+    pdf.ln(3)
+
+def _pdf_markdown(pdf, text):
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i].rstrip()
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            rows = []
+            while i < len(lines) and lines[i].strip().startswith("|"):
+                if not _TABLE_SEPARATOR.match(lines[i].strip()):
+                    rows.append(_cells(lines[i]))
+                i += 1
+            _pdf_table(pdf, rows)
+            continue
+        i += 1
+        if not stripped:
+            pdf.ln(2)
+        elif stripped.startswith("#"):
+            level = len(stripped) - len(stripped.lstrip("#"))
+            pdf.ln(2)
+            pdf.set_font(pdf.family, "B", max(10, 16 - 2 * level))
+            pdf.block(7, _inline(stripped.lstrip("#").strip().replace("**", "")))
+        elif re.fullmatch(r"-{3,}|\*{3,}", stripped):
+            pdf.ln(1)
+            pdf.line(pdf.l_margin, pdf.get_y(), pdf.w - pdf.r_margin, pdf.get_y())
+            pdf.ln(2)
+        else:
+            bullet = _BULLET.match(line)
+            pdf.set_font(pdf.family, "", 10)
+            if bullet:
+                indent = 4 + min(len(bullet.group(1)), 8)
+                marker = bullet.group(2) if bullet.group(2)[0].isdigit() else "-"
+                pdf.set_x(pdf.l_margin + indent)
+                pdf.block(5, f"{marker} {_markup(bullet.group(3))}", markdown=True)
+            else:
+                pdf.block(5, _markup(stripped), markdown=True)
+
+def write_pdf(out, title, sections, inputs, logo_data_uri=""):
+    """Lay out the report with fpdf2 (pure Python) and write it to `out`."""
+    pdf = _ReportPDF()
+    pdf.set_title(title)
+    pdf.add_page()
+    if logo_data_uri.startswith("data:"):
+        pdf.image(io.BytesIO(base64.b64decode(logo_data_uri.split(",", 1)[1])), x=pdf.l_margin, w=18)
+        pdf.ln(2)
+    pdf.set_font(pdf.family, "B", 20)
+    pdf.set_text_color(10, 35, 81)
+    pdf.block(10, title)
+    pdf.set_text_color(51, 51, 51)
+    for label, value in inputs:
+        pdf.set_font(pdf.family, "B", 10)
+        pdf.block(6, f"{label}:")
+        pdf.set_font(pdf.family, "", 10)
+        pdf.block(5, value)
+    for section in sections:
+        pdf.add_page()
+        pdf.set_font(pdf.family, "B", 16)
+        pdf.set_text_color(10, 35, 81)
+        pdf.block(9, section.title)
+        pdf.set_text_color(51, 51, 51)
+        _pdf_markdown(pdf, section.text())
+    pdf.output(out)
+
+# --- Artifacts -------------------------------------------------------------
+
+_ARTIFACTS = OrderedDict()
+_ARTIFACTS_LOCK = threading.Lock()
+MAX_CACHED_ARTIFACTS = 32
+MAX_CACHED_ARTIFACT_BYTES = 64 * 1024 * 1024
+_artifact_bytes = 0
+
+def artifact_key(fmt, title, sections, inputs, logo_data_uri=""):
+    h = hashlib.sha256(f"{fmt}\x00{title}".encode("utf-8"))
+    for label, value in inputs:
+        h.update(f"\x00{label}\x00{value}".encode("utf-8"))
+    for section in sections:
+        h.update(f"\x00{section.title}\x00{section.key}".encode("utf-8"))
+    h.update(hashlib.sha256(logo_data_uri.encode("ascii")).digest())
+    return h.hexdigest()
+
+def build_export(fmt, title, sections, inputs, logo_data_uri=""):
+    """
+    Bytes of the combined report in `fmt` (a key of FORMATS). `inputs` is a
+    list of (label, value) pairs shown above the sections. Cached per content,
+    up to MAX_CACHED_ARTIFACTS artifacts and MAX_CACHED_ARTIFACT_BYTES in total.
+    """
+    global _artifact_bytes
+    key = artifact_key(fmt, title, sections, inputs, logo_data_uri)
+    with _ARTIFACTS_LOCK:
+        if key in _ARTIFACTS:
+            _ARTIFACTS.move_to_end(key)
+            return _ARTIFACTS[key]
+
+    if fmt == "PDF":
+        buf = io.BytesIO()
+        write_pdf(buf, title, sections, inputs, logo_data_uri)
+        data = buf.getvalue()
+    else:
+        if fmt == "HTML":
+            chunks = html_chunks(title, sections, inputs, logo_data_uri)
+        else:
+            chunks = markdown_chunks(title, sections, inputs)
+        data = "".join(chunks).encode("utf-8")
+
+    with _ARTIFACTS_LOCK:
+        if key not in _ARTIFACTS:
+            _ARTIFACTS[key] = data
+            _artifact_bytes += len(data)
+        while len(_ARTIFACTS) > MAX_CACHED_ARTIFACTS or _artifact_bytes > MAX_CACHED_ARTIFACT_BYTES:
+            _artifact_bytes -= len(_ARTIFACTS.popitem(last=False)[1])
+    return data
+
+def cache_stats():
+    """Size of the artifact cache, for the ops page."""
+    with _ARTIFACTS_LOCK:
+        return {"artifacts": len(_ARTIFACTS), "bytes": _artifact_bytes, "max_bytes": MAX_CACHED_ARTIFACT_BYTES}
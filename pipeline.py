@@ -0,0 +1,648 @@
+"""
+StartWise generation pipeline: prompt templates, model calls and output cleanup.
+
+This module has no Streamlit dependency so it can be shared by the app
+(`app.py`) and the headless batch runner (`batch.py`).
+"""
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import deque
+
+import google.generativeai as genai
+
+# --- Helpers ---------------------------------------------------------------
+
+def clean_model_markdown(text: str) -> str:
+    """
+    Cleanups for model output so we don't render stray HTML tags as text and
+    remove unwanted headings like "Generated Persona Image".
+
+    - remove any lines that are just <div> or </div>
+    - (safety) remove bare opening/closing div tags inline as well
+    - strip lines containing the phrase "Generated Persona Image" (any case)
+    - collapse extra whitespace
+    """
+    # remove lines that only contain <div> or </div> (with optional spaces)
+    text = re.sub(r"^\s*</?div>\s*$", "", text, flags=re.IGNORECASE | re.MULTILINE)
+    # remove any stray standalone <div> / </div> that might appear inline
+    text = re.sub(r"\s*</?div>\s*", " ", text, flags=re.IGNORECASE)
+    # remove headings/lines that mention "Generated Persona Image"
+    text = re.sub(r"^.*Generated\s*Persona\s*Image.*$", "", text, flags=re.IGNORECASE | re.MULTILINE)
+    # compact multiple blank lines
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+def input_key(idea: str, launch_plan: str) -> str:
+    """Stable short id for an (idea, launch_plan) pair."""
+    return hashlib.sha256(f"{idea}\x00{launch_plan}".encode("utf-8")).hexdigest()[:16]
+
+# --- Gemini config (TEXT model only) ---------------------------------------
+
+MODEL_NAME = "gemini-2.5-flash-preview-09-2025"
+# GA counterpart of MODEL_NAME; used for hedge requests by default
+FALLBACK_MODEL_NAME = "gemini-2.5-flash"
+API_KEY = os.environ.get("GEMINI_API_KEY", "YOUR_GEMINI_API_KEY")
+
+def configure_gemini(api_key: str = API_KEY):
+    """Configure the Gemini client. Raises on failure; callers decide how to report it."""
+    genai.configure(api_key=api_key)
+
+# --- Prompts (no image instructions anywhere) ------------------------------
+
+SEGMENTATION_PROMPT_TEMPLATE = """
+You are a Startup Market Segmentation Expert with access to generative tools and data APIs.
+
+---
+### USER INPUTS
+* **Startup Idea:** {idea}
+* **Launch Plan:** {launch_plan}
+---
+
+Based on these inputs, generate a detailed market segmentation analysis.
+
+### Your objectives:
+1. Generate detailed target market and customer segmentation for the startup’s product idea.
+
+---
+### Step 1: Primary Target Market
+Write one crisp sentence defining:
+* The broad target market (country, demographics, psychographic need) based on the user's inputs.
+---
+### Step 2: Customer Segments (3–5)
+For each segment, provide:
+* **Segment Name:** Catchy but descriptive
+* **Demographics:** Age, gender, income, geography
+* **Psychographics:** Values, attitudes, lifestyle
+* **Buying Motivations:** Key reasons to purchase
+* **Pain Points / Unmet Needs:**
+* **Channels & Media Preferences:** (Instagram, Blinkit, Zomato, LinkedIn, etc.)
+* **Price Sensitivity:** High / Medium / Low
+* **Fit with Brand:** High / Medium / Low
+* **Persona Summary:** ≤80 words; written like a short story about this person’s daily life
+Use realistic, India-specific details and current digital behavior cues based on the user's inputs.
+---
+### Step 3: Segment Prioritization
+* Identify 1–2 high-priority segments to target first, and justify clearly.
+* **Suggest the key marketing message or value proposition for them.**
+---
+### Step 4: Positioning Implication
+* Define how the brand should position itself to attract these top segments.
+* Suggest tone of voice and visual style cues for creatives.
+---
+### Step 5: Risks / Overlooked Audiences
+* Highlight blind spots, compliance or regulatory concerns (e.g., FSSAI for beverages), and emerging opportunities.
+---
+### Step 6: Output Formatting
+Return your answer using clean, readable Markdown (headings, bullets) for clarity. If you create tables, ensure they are valid Markdown tables.
+---
+### Constraints
+* Keep it concise, practical, and realistic to the Indian market.
+* Use INR and Asia/Kolkata context.
+* Avoid generic phrasing; show behavioral, digital, and cultural nuance relevant to the user's idea.
+"""
+
+TL_PROMPT_TEMPLATE = """
+You are a Competitive Intelligence and Marketing Landscape Analyst.
+
+---
+### STARTUP CONTEXT (Input)
+{segmentation_data}
+---
+### YOUR TASK
+Based *only* on the context above (startup idea, target market, personas), generate the following competitive analysis:
+
+Step 1 | Competitor Identification
+* Identify 5–7 direct and indirect competitors in the same product category and geography.
+* Mention each brand’s focus (e.g., RTD coffee, café chain, functional beverage).
+* Add URLs or handles where possible. If you infer, mark “(assumed).”
+
+Step 2 | Competitor Landscape Summary (Table)
+For each competitor, compile:
+* Brand Positioning (self-description)
+* Price Tier (₹ range or value vs premium)
+* Distribution Channels (retail, q-commerce, D2C, marketplaces)
+* Digital Presence (traffic source mix – inferred if needed)
+* Marketing Messaging (themes, tone)
+* Differentiators / Innovations
+
+Step 3 | Market & Category Insights
+* Key trends and consumer behaviors (reasonable inferences are fine).
+* Market trajectory (growing / maturing / fragmented).
+* 3 whitespace areas where players underperform.
+
+Step 4 | Strategic Implications for the Startup
+* Opportunities and threats.
+* Potential differentiation levers (tone, channels, partnerships).
+* Recommended price & distribution strategy.
+* Early creative tone suggestion.
+
+### Output Formatting (Text only)
+Return clean Markdown with headings, bullets, and one summary table. No code blocks.
+"""
+
+MR_PROMPT_TEMPLATE = """
+You are a Brand Positioning & Targeting Strategist.
+
+---
+### Step 1 | Input Recap
+Summarize from context (reasonable inferences allowed):
+- Product Context
+- Geography
+- Model
+- Budget (Monthly Marketing) – mark ASSUMED if inferred
+- Target segments (2–3 prioritized)
+- Competitor set (3–5)
+- Category drivers (3–5)
+
+---
+### Step 2 | Audience Refinement (Text only)
+For each target segment:
+• Audience DNA: demographics, top interests, negative audiences  
+• Estimated CPM/CPC, CTR, CVR (mark **ASSUMED** if inferred)  
+• Summary:
+  - Audience DNA paragraph
+  - Top 5 interests/keywords
+  - Estimated Reach, CPM (₹), CPC (₹), Channels
+
+Restrict at Step 2 in this response. Do not ask questions at the end.
+"""
+
+def segmentation_prompt(idea, launch_plan):
+    return SEGMENTATION_PROMPT_TEMPLATE.format(idea=idea, launch_plan=launch_plan)
+
+def target_lens_prompt(segmentation_data):
+    return TL_PROMPT_TEMPLATE.format(segmentation_data=segmentation_data)
+
+def market_radar_prompt(segmentation_data):
+    return MR_PROMPT_TEMPLATE.format(segmentation_data=segmentation_data)
+
+# --- Stage graph -----------------------------------------------------------
+
+# Each stage lists the values it consumes. "idea" / "launch_plan" are the user
+# inputs; any other name is the output of an earlier stage. STAGE_ORDER is a
+# topological order of this graph.
+STAGES = {
+    "segmentation": ("idea", "launch_plan"),
+    "target_lens": ("segmentation",),
+    "market_radar": ("segmentation",),
+}
+STAGE_ORDER = ("segmentation", "target_lens", "market_radar")
+STAGE_LABELS = {
+    "segmentation": "Segmentation",
+    "target_lens": "Target Lens",
+    "market_radar": "Market Radar",
+}
+STAGE_TEMPLATES = {
+    "segmentation": SEGMENTATION_PROMPT_TEMPLATE,
+    "target_lens": TL_PROMPT_TEMPLATE,
+    "market_radar": MR_PROMPT_TEMPLATE,
+}
+
+# prompt for a stage from the values it consumes
+STAGE_PROMPTS = {
+    "segmentation": lambda v: segmentation_prompt(v["idea"], v["launch_plan"]),
+    "target_lens": lambda v: target_lens_prompt(v["segmentation"]),
+    "market_radar": lambda v: market_radar_prompt(v["segmentation"]),
+}
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def stage_hash(stage: str, values: dict) -> str:
+    """Hash of everything a stage's output depends on: its template and its inputs."""
+    h = hashlib.sha256(stage.encode("utf-8"))
+    h.update(STAGE_TEMPLATES[stage].encode("utf-8"))
+    for dep in STAGES[stage]:
+        h.update(b"\x00" + content_hash(values.get(dep) or "").encode("ascii"))
+    return h.hexdigest()
+
+def _failed(text) -> bool:
+    """A stage output that can't be used: missing, blank or an "Error: ..." string."""
+    return not (text or "").strip() or text.startswith("Error:")
+
+def _non_empty(stage, text):
+    """`text`, or an "Error: ..." string if the model returned nothing."""
+    if not (text or "").strip():
+        return f"Error: Could not generate {STAGE_LABELS[stage]} content. The model returned no text."
+    return text
+
+def refresh_stages(values: dict, hashes: dict, generate, force=(), on_stage=None, on_stage_done=None) -> list:
+    """
+    Bring `values` up to date with the fewest model calls.
+
+    `values` holds the user inputs and the current stage outputs; `hashes` maps
+    each stage to the `stage_hash` its current output was generated from. Both
+    are updated in place. A stage is rerun only if it is in `force`, has no
+    output, or its inputs changed since it last ran; a rerun whose text comes
+    back identical therefore leaves its dependents cached.
+
+    `generate(stage, values)` produces a stage's text ("Error: ..." on failure;
+    an empty result is turned into one) and `on_stage(stage)` is called before
+    each call. `on_stage_done(stage)` is called once a stage's output and hash
+    have both changed, so a caller can persist the pair before anything else
+    can interrupt it. A stage whose upstream output is missing, empty or an
+    error is not sent to the model. Returns the stages run.
+    """
+    ran = []
+    for stage in STAGE_ORDER:
+        failed = [dep for dep in STAGES[stage] if dep in STAGES and _failed(values.get(dep))]
+        if failed:
+            values[stage] = (
+                f"Error: Could not generate {STAGE_LABELS[stage]} because {STAGE_LABELS[failed[0]]} failed."
+            )
+            hashes.pop(stage, None)
+            if on_stage_done:
+                on_stage_done(stage)
+            continue
+
+        h = stage_hash(stage, values)
+        if stage not in force and values.get(stage) and hashes.get(stage) == h:
+            continue
+
+        if on_stage:
+            on_stage(stage)
+        text = _non_empty(stage, generate(stage, values))
+        values[stage] = text
+        ran.append(stage)
+        if not _failed(text):
+            hashes[stage] = h
+        else:
+            # never cache a failure; it is retried on the next refresh
+            hashes.pop(stage, None)
+        if on_stage_done:
+            on_stage_done(stage)
+    return ran
+
+# --- Gemini calls ----------------------------------------------------------
+
+class RateLimiter:
+    """
+    Bounds concurrent model calls and spaces request starts so we stay under
+    the API's requests-per-minute quota. Use as `async with limiter: ...`.
+    """
+
+    def __init__(self, max_concurrency: int = 4, requests_per_minute: float = 60.0):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        if self._interval:
+            try:
+                async with self._lock:
+                    now = time.monotonic()
+                    wait = self._next_start - now
+                    self._next_start = max(now, self._next_start) + self._interval
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            except BaseException:
+                # cancelled while spacing: __aexit__ won't run, so give the slot back here
+                self.release()
+                raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    async def try_acquire(self) -> bool:
+        """
+        Take a slot only if that needs no waiting: one is free and the
+        per-minute spacing allows a start now. Pair a True result with `release()`.
+        """
+        if self._semaphore.locked() or (self._interval and self._next_start > time.monotonic()):
+            return False
+        await self._semaphore.acquire()  # a slot is free, so this returns without suspending
+        if self._interval:
+            self._next_start = max(time.monotonic(), self._next_start) + self._interval
+        return True
+
+    def release(self):
+        self._semaphore.release()
+
+# --- Hedged calls ----------------------------------------------------------
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class HedgePolicy:
+    """
+    When to fire a backup request, and what it cost.
+
+    The hedge delay for a stage is the `percentile` of that stage's recent
+    first-token latencies (or `default_delay` until `min_samples` are seen),
+    clamped to at least `min_delay`. The backup uses `fallback_models[stage]`,
+    or the primary model again if the stage has no fallback. Per-stage metrics
+    are kept in `self.metrics`; see `summary()`.
+
+    When a backup wins, the primary is cancelled, so its full latency is never
+    seen. If it had not streamed a token yet, it still needed at least the
+    fastest recent time-to-stream-the-answer for that stage; that is recorded
+    as the call's saving, a lower bound. A primary that had started streaming
+    counts as saving nothing.
+    """
+
+    def __init__(self, percentile=0.95, default_delay=8.0, min_delay=1.0, min_samples=20,
+                 window=200, fallback_models=None, enabled=True):
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.fallback_models = dict.fromkeys(STAGE_ORDER, FALLBACK_MODEL_NAME) if fallback_models is None else fallback_models
+        self.enabled = enabled
+        self._first_token = {stage: deque(maxlen=window) for stage in STAGE_ORDER}
+        # first token -> last chunk, for the attempts that won
+        self._streaming = {stage: deque(maxlen=window) for stage in STAGE_ORDER}
+        self.metrics = {
+            stage: {
+                "calls": 0, "hedged": 0, "hedge_wins": 0, "hedges_skipped": 0, "failures": 0, "saved": 0.0,
+                "latencies": deque(maxlen=window),
+                # latency plus the hedge's saving: what the call would have taken unhedged, at least
+                "unhedged": deque(maxlen=window),
+            }
+            for stage in STAGE_ORDER
+        }
+
+    def delay(self, stage):
+        samples = self._first_token[stage]
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, _percentile(samples, self.percentile))
+
+    def observe_first_token(self, stage, seconds):
+        self._first_token[stage].append(seconds)
+
+    def observe_streaming(self, stage, seconds):
+        self._streaming[stage].append(seconds)
+
+    def min_streaming(self, stage):
+        samples = self._streaming[stage]
+        return min(samples) if samples else 0.0
+
+    def record(self, stage, seconds, hedged, hedge_won, failed=False, saved=0.0, skipped=False):
+        m = self.metrics[stage]
+        m["calls"] += 1
+        m["hedged"] += hedged
+        m["hedge_wins"] += hedge_won
+        m["hedges_skipped"] += skipped
+        m["failures"] += failed
+        m["saved"] += saved
+        if not failed:
+            m["latencies"].append(seconds)
+            m["unhedged"].append(seconds + saved)
+
+    def summary(self):
+        """Per-stage counters and latency percentiles (seconds)."""
+        out = {}
+        for stage, m in self.metrics.items():
+            lat = list(m["latencies"])
+            unhedged = list(m["unhedged"])
+            out[stage] = {
+                "calls": m["calls"],
+                "hedged": m["hedged"],
+                "hedge_wins": m["hedge_wins"],
+                # backups not sent because the rate limiter had no free slot
+                "hedges_skipped": m["hedges_skipped"],
+                "failures": m["failures"],
+                # each hedge is one extra model call
+                "extra_call_rate": m["hedged"] / m["calls"] if m["calls"] else 0.0,
+                "p50": _percentile(lat, 0.50) if lat else None,
+                "p95": _percentile(lat, 0.95) if lat else None,
+                "p99": _percentile(lat, 0.99) if lat else None,
+                # lower bounds: seconds hedging saved in total, and p99 without it
+                "saved": m["saved"],
+                "p99_unhedged": _percentile(unhedged, 0.99) if unhedged else None,
+                "hedge_delay": self.delay(stage),
+            }
+        return out
+
+DEFAULT_HEDGE_POLICY = HedgePolicy()
+
+class _FirstToken(asyncio.Event):
+    """Event set on the first streamed chunk, remembering when that was."""
+    at = None
+
+    def set(self):
+        if self.at is None:
+            self.at = time.monotonic()
+        super().set()
+
+# finish reasons of a complete answer; anything else (SAFETY, RECITATION, ...) is a failure
+COMPLETE_FINISH_REASONS = ("STOP", "MAX_TOKENS")
+
+async def _streamed_attempt(prompt, model_name, first_token: _FirstToken):
+    """
+    Stream one answer. Raises ValueError if the prompt was blocked or the
+    answer did not finish normally (e.g. stopped for safety part-way), like
+    `response.text` does for a non-streamed call.
+    """
+    model = genai.GenerativeModel(model_name)
+    resp = await model.generate_content_async(prompt, stream=True)
+    parts = []
+    finish_reason = None
+    async for chunk in resp:
+        first_token.set()
+        block_reason = chunk.prompt_feedback.block_reason
+        if block_reason:
+            raise ValueError(f"The prompt was blocked ({block_reason.name}).")
+        if not chunk.candidates:
+            continue
+        candidate = chunk.candidates[0]
+        # read the parts directly: `chunk.text` raises on chunks that only carry finish metadata
+        parts.extend(part.text for part in candidate.content.parts if part.text)
+        if candidate.finish_reason:
+            finish_reason = candidate.finish_reason
+    if finish_reason is None or finish_reason.name not in COMPLETE_FINISH_REASONS:
+        name = finish_reason.name if finish_reason is not None else "none"
+        raise ValueError(f"The response did not finish normally (finish_reason={name}).")
+    return clean_model_markdown("".join(parts))
+
+async def generate_hedged_async(prompt: str, stage: str, policy: HedgePolicy = DEFAULT_HEDGE_POLICY,
+                                limiter: RateLimiter = None) -> str:
+    """
+    Generate one stage's text, returning cleaned Markdown.
+
+    If the first token hasn't arrived within `policy.delay(stage)` a backup
+    request is started and whichever finishes first wins; the other is
+    cancelled. The caller holds a `limiter` slot for the primary; the backup
+    needs one of its own and is skipped if none is free right away, so hedges
+    never push past the concurrency or requests-per-minute limit. Exceptions
+    propagate if every attempt fails.
+    """
+    started = time.monotonic()
+    primary_token = _FirstToken()
+    primary = asyncio.create_task(_streamed_attempt(prompt, MODEL_NAME, primary_token))
+    tasks = {primary}
+    backup = backup_token = None
+    skipped = False
+
+    try:
+        if policy.enabled:
+            token_wait = asyncio.create_task(primary_token.wait())
+            await asyncio.wait({primary, token_wait}, timeout=policy.delay(stage), return_when=asyncio.FIRST_COMPLETED)
+            token_wait.cancel()
+            if not primary_token.is_set() and not primary.done():
+                if limiter is None or await limiter.try_acquire():
+                    model_name = policy.fallback_models.get(stage) or MODEL_NAME
+                    backup_token = _FirstToken()
+                    backup = asyncio.create_task(_streamed_attempt(prompt, model_name, backup_token))
+                    if limiter is not None:
+                        # a callback, so the slot is returned even if the task is cancelled before it starts
+                        backup.add_done_callback(lambda _: limiter.release())
+                    tasks.add(backup)
+                else:
+                    skipped = True
+
+        while True:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((t for t in done if not t.exception()), None)
+            if winner is not None or not pending:
+                break
+            tasks = pending
+
+        finished = time.monotonic()
+        elapsed = finished - started
+        # a primary that never streamed gives a lower bound, which still pushes
+        # the percentile the right way
+        policy.observe_first_token(stage, (primary_token.at or finished) - started)
+        if winner is None:
+            policy.record(stage, elapsed, backup is not None, False, failed=True, skipped=skipped)
+            raise next(iter(done)).exception()
+        winner_token = backup_token if winner is backup else primary_token
+        if winner_token.at is not None:
+            policy.observe_streaming(stage, finished - winner_token.at)
+        saved = policy.min_streaming(stage) if winner is backup and primary_token.at is None else 0.0
+        policy.record(stage, elapsed, backup is not None, winner is backup, saved=saved, skipped=skipped)
+        return winner.result()
+    finally:
+        for t in (primary, backup):
+            if t is not None and not t.done():
+                t.cancel()
+
+async def _limited_call(prompt, stage, limiter):
+    if limiter is None:
+        return await generate_hedged_async(prompt, stage)
+    async with limiter:
+        return await generate_hedged_async(prompt, stage, limiter=limiter)
+
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+def submit(coro):
+    """
+    Schedule `coro` from synchronous code (e.g. a Streamlit script) and return
+    a `concurrent.futures.Future` for its result.
+
+    The async Gemini client binds to the first event loop it is used on, so all
+    sync callers share one long-lived loop on a background thread instead of
+    calling `asyncio.run` per request.
+    """
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name="gemini-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop)
+
+def run_sync(coro):
+    """Run `coro` on the shared background loop and wait for its result."""
+    return submit(coro).result()
+
+# Limits every model call the app makes from this process. Only ever used on
+# the background loop, so its asyncio primitives bind there.
+SHARED_LIMITER = RateLimiter(max_concurrency=8, requests_per_minute=120)
+
+def generate_text_hedged(prompt: str, stage: str, policy: HedgePolicy = DEFAULT_HEDGE_POLICY) -> str:
+    """Blocking, rate-limited wrapper around `generate_hedged_async`."""
+    async def call():
+        async with SHARED_LIMITER:
+            return await generate_hedged_async(prompt, stage, policy, SHARED_LIMITER)
+    return run_sync(call())
+
+async def _run_chain(idea, launch_plan, call_stage, on_stage_done=None) -> dict:
+    """
+    Segmentation -> (Target Lens, Market Radar). The two downstream stages only
+    depend on the segmentation, so they run concurrently. Failures are recorded
+    as "Error: ..." strings, mirroring what the app stores in session state.
+    `on_stage_done(stage, text)` is called as each stage finishes.
+    """
+    values = {"idea": idea, "launch_plan": launch_plan}
+    done = on_stage_done or (lambda stage, text: None)
+
+    try:
+        seg = _non_empty("segmentation", await call_stage("segmentation", values))
+    except Exception as e:
+        seg = f"Error: Could not generate content. {e}"
+    done("segmentation", seg)
+
+    if _failed(seg):
+        result = {
+            "segmentation_output": seg,
+            "target_lens_output": "Error: Could not generate Target Lens because Segmentation failed.",
+            "market_radar_output": "Error: Could not generate Market Radar because Segmentation failed.",
+        }
+        done("target_lens", result["target_lens_output"])
+        done("market_radar", result["market_radar_output"])
+        return result
+
+    values["segmentation"] = seg
+    errors = {
+        "target_lens": "Error: Could not generate content. {}",
+        "market_radar": "Error: Could not generate Market Radar content. {}",
+    }
+
+    async def downstream(stage):
+        try:
+            text = _non_empty(stage, await call_stage(stage, values))
+        except Exception as e:
+            text = errors[stage].format(e)
+        done(stage, text)
+        return text
+
+    tl, mr = await asyncio.gather(downstream("target_lens"), downstream("market_radar"))
+    return {
+        "segmentation_output": seg,
+        "target_lens_output": tl,
+        "market_radar_output": mr,
+    }
+
+async def run_chain_async(idea: str, launch_plan: str, limiter: RateLimiter = None) -> dict:
+    """Run the full chain for one idea; see `_run_chain`."""
+    async def call_stage(stage, values):
+        return await _limited_call(STAGE_PROMPTS[stage](values), stage, limiter)
+    return await _run_chain(idea, launch_plan, call_stage)
+
+async def run_variants_async(variants, limiter: RateLimiter = SHARED_LIMITER, on_stage_done=None) -> list:
+    """
+    Run the full chain for several (idea, launch_plan) variants concurrently.
+
+    Stage calls whose `stage_hash` matches (same template, same inputs) are
+    made once and shared, so e.g. two variants with the same idea and plan
+    cost one segmentation. `on_stage_done(index, stage, text)` reports each
+    stage as it lands. Returns one result dict per variant, in order.
+    """
+    inflight = {}
+
+    async def call_stage(stage, values):
+        key = stage_hash(stage, values)
+        if key not in inflight:
+            inflight[key] = asyncio.ensure_future(_limited_call(STAGE_PROMPTS[stage](values), stage, limiter))
+        # shield so one variant being cancelled doesn't cancel a shared call
+        return await asyncio.shield(inflight[key])
+
+    def reporter(index):
+        if on_stage_done is None:
+            return None
+        return lambda stage, text: on_stage_done(index, stage, text)
+
+    return await asyncio.gather(*(
+        _run_chain(idea, launch_plan, call_stage, reporter(i))
+        for i, (idea, launch_plan) in enumerate(variants)
+    ))
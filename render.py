@@ -0,0 +1,177 @@
+"""
+Report rendering: model Markdown -> sanitized HTML, converted once per text.
+
+Pages emit the stored HTML verbatim (`st.html`) instead of handing Streamlit
+the raw Markdown to re-parse on every rerun.
+"""
+import html
+import re
+import time
+from html.parser import HTMLParser
+
+import markdown
+
+# --- Sanitizer -------------------------------------------------------------
+
+ALLOWED_TAGS = {
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "br", "hr", "blockquote", "pre", "code",
+    "ul", "ol", "li", "strong", "em", "b", "i", "del", "sup", "sub", "span", "a",
+    "table", "thead", "tbody", "tr", "th", "td",
+}
+ALLOWED_ATTRS = {
+    "a": {"href", "title"},
+    "th": {"align", "style"},
+    "td": {"align", "style"},
+}
+# tags whose content is dropped along with the tag
+DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template", "noscript", "textarea"}
+VOID_TAGS = {"br", "hr"}
+
+_SAFE_HREF = re.compile(r"^(https?:|mailto:|#)", re.IGNORECASE)
+_SAFE_STYLE = re.compile(r"^\s*text-align:\s*(left|right|center)\s*;?\s*$", re.IGNORECASE)
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self._skip_depth = 0
+
+    def _attrs(self, tag, attrs):
+        allowed = ALLOWED_ATTRS.get(tag, ())
+        kept = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name == "href" and not _SAFE_HREF.match(value):
+                continue
+            if name == "style" and not _SAFE_STYLE.match(value):
+                continue
+            kept.append(f' {name}="{html.escape(value, quote=True)}"')
+        if tag == "a":
+            kept.append(' target="_blank" rel="noopener noreferrer"')
+        return "".join(kept)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self._skip_depth += 1
+        elif not self._skip_depth and tag in ALLOWED_TAGS:
+            self.out.append(f"<{tag}{self._attrs(tag, attrs)}>")
+
+    def handle_startendtag(self, tag, attrs):
+        if not self._skip_depth and tag in VOID_TAGS:
+            self.out.append(f"<{tag}>")
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif not self._skip_depth and tag in ALLOWED_TAGS and tag not in VOID_TAGS:
+            self.out.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.out.append(html.escape(data, quote=False))
+
+def sanitize_html(fragment: str) -> str:
+    """Keep only allow-listed tags/attributes; everything else becomes text or is dropped."""
+    parser = _Sanitizer()
+    parser.feed(fragment)
+    parser.close()
+    return "".join(parser.out)
+
+# --- Normalization ---------------------------------------------------------
+
+# Model output is written for GitHub-flavored Markdown. Python-Markdown is
+# stricter: a list or table must follow a blank line, and a nested item needs
+# four spaces per level where models indent by two (or three under "1.").
+
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_LIST_ITEM = re.compile(r"^( *)([*+-]|\d{1,9}[.)])( +)(?=\S)")
+_RULE = re.compile(r"^ *([-*_])( *\1){2,} *$")
+
+def normalize_markdown(text: str) -> str:
+    """
+    Rewrite GFM-style Markdown into the form Python-Markdown parses the same
+    way: a blank line before a list or table that directly follows text (and
+    after a table), and list nesting re-indented to four spaces per level.
+    Fenced code is left alone.
+    """
+    out = []
+    levels = []  # (indent, content column) of each open list level
+    in_fence = in_table = False
+    for line in (text or "").expandtabs(4).splitlines():
+        if _FENCE.match(line):
+            in_fence = not in_fence
+            out.append(line)
+            continue
+        if in_fence:
+            out.append(line)
+            continue
+        prev_blank = not out or not out[-1].strip()
+        stripped = line.lstrip(" ")
+        indent = len(line) - len(stripped)
+
+        if not stripped:
+            in_table = False
+            out.append("")
+            continue
+        if stripped.startswith("|"):
+            if not in_table and not prev_blank:
+                out.append("")
+            in_table = True
+            levels = []
+            out.append(stripped)
+            continue
+        if in_table:
+            out.append("")
+            in_table = prev_blank = False
+
+        item = _LIST_ITEM.match(line)
+        if item and not _RULE.match(line):
+            marker = item.group(2)
+            if not levels and not prev_blank:
+                # as in GFM, only a bullet or a list starting at 1 can interrupt a paragraph
+                if marker[0].isdigit() and int(marker[:-1]) != 1:
+                    out.append(line)
+                    continue
+                out.append("")
+            while levels and indent < levels[-1][0]:
+                levels.pop()
+            if levels and indent < levels[-1][1]:
+                levels.pop()  # a sibling of the innermost item
+            levels.append((indent, indent + len(marker) + len(item.group(3))))
+            out.append("    " * (len(levels) - 1) + line[indent:])
+        elif levels and indent:
+            # continuation of the item whose content column it reaches
+            depth = sum(1 for _, column in levels if indent >= column)
+            out.append("    " * max(depth, 1) + stripped)
+        else:
+            if prev_blank:
+                levels = []
+            out.append(line)
+    return "\n".join(out)
+
+# --- Conversion ------------------------------------------------------------
+
+# process-wide counters, shown on the ops page
+RENDER_STATS = {"conversions": 0, "convert_seconds": 0.0, "cache_hits": 0}
+
+def to_html(text: str) -> str:
+    """Convert model Markdown to sanitized HTML."""
+    started = time.perf_counter()
+    rendered = sanitize_html(markdown.markdown(
+        normalize_markdown(text), extensions=["tables", "sane_lists", "fenced_code"]
+    ))
+    RENDER_STATS["conversions"] += 1
+    RENDER_STATS["convert_seconds"] += time.perf_counter() - started
+    return rendered
+
+def cached_html(key, lookup, load_text) -> str:
+    """
+    Stored HTML for content `key` via `lookup(key)`; on a miss, convert
+    `load_text()`. Callers store the result under `key` themselves.
+    """
+    rendered = lookup(key)
+    if rendered is not None:
+        RENDER_STATS["cache_hits"] += 1
+        return rendered
+    return to_html(load_text())
@@ -0,0 +1,354 @@
+"""
+Near-duplicate lookup for (idea, launch_plan) submissions.
+
+Texts are normalized and turned into signed, hashed word/character n-gram
+vectors (no model, no network) to find candidates: exactly for small corpora,
+through multi-probe random-hyperplane LSH once the index grows. Candidates are
+then compared word by word, idea and launch plan separately, so a swapped key
+word ("baby" vs "pet") or an unrelated launch plan rules a match out even when
+most n-grams agree.
+"""
+import math
+import re
+import threading
+import unicodedata
+import zlib
+from array import array
+
+import numpy as np
+
+# --- Normalization ---------------------------------------------------------
+
+# Spelling variants that n-grams alone can't bridge.
+ALIASES = {
+    "bengaluru": "bangalore",
+    "bombay": "mumbai",
+    "gurugram": "gurgaon",
+    "madras": "chennai",
+    "calcutta": "kolkata",
+    "direct to consumer": "d2c",
+    "dtc": "d2c",
+    "cold brew": "coldbrew",
+}
+_ALIAS_RE = re.compile(r"\b(" + "|".join(re.escape(k) for k in sorted(ALIASES, key=len, reverse=True)) + r")\b")
+
+# Function words, plus words almost every idea or plan uses ("brand", "launch"):
+# they tell one submission from another no better than "the" does.
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it its of on or our over per plus "
+    "the their these this those through to via who with "
+    "aimed brand business company first focus launch new product products service "
+    "services start startup targeting".split()
+)
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = re.sub(r"[^\w]+", " ", text).strip()
+    return _ALIAS_RE.sub(lambda m: ALIASES[m.group(1)], text)
+
+def content_words(text: str) -> list:
+    return [w for w in normalize_text(text).split() if w not in STOPWORDS]
+
+_SUFFIXES = ("ing", "ers", "er", "es", "s", "ed")
+
+def _stem(word):
+    """Crude suffix stripping: "tutors" ~ "tutor", "gyms" ~ "gym", "renting" ~ "rent"."""
+    for suffix in _SUFFIXES:
+        if len(word) >= len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+# --- Word matching ---------------------------------------------------------
+
+# Words shorter than this only match on their stem: "men" must not match "women".
+MIN_FUZZY_LENGTH = 5
+# Character-trigram similarity below which two words don't match at all.
+FUZZY_FLOOR = 0.5
+
+def _trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _word_similarity(a, b):
+    if a == b or _stem(a) == _stem(b):
+        return 1.0
+    if min(len(a), len(b)) < MIN_FUZZY_LENGTH:
+        return 0.0
+    ta, tb = _trigrams(a), _trigrams(b)
+    score = len(ta & tb) / math.sqrt(len(ta) * len(tb))
+    return score if score >= FUZZY_FLOOR else 0.0
+
+def _coverage(words, other):
+    """Mean over `words` of the best match among `other` (or two adjacent `other` words joined)."""
+    targets = set(other) | {a + b for a, b in zip(other, other[1:])}
+    return sum(max(_word_similarity(w, t) for t in targets) for w in words) / len(words)
+
+def match_words(a: list, b: list) -> float:
+    """
+    How well two content-word lists line up, from 0 to 1. Every word counts
+    the same whatever its length. If all of one side's words (at least two)
+    are found in the other, it is a rewording with extra detail and scores 1.
+    Otherwise the two directions are averaged, so a word swapped for an
+    unrelated one ("baby" -> "pet") costs its full share on both sides.
+    """
+    if not a or not b:
+        return 0.0
+    forward, backward = _coverage(a, b), _coverage(b, a)
+    if (forward == 1.0 and len(a) > 1) or (backward == 1.0 and len(b) > 1):
+        return 1.0
+    return (forward + backward) / 2
+
+def word_match(a: str, b: str) -> float:
+    return match_words(content_words(a), content_words(b))
+
+# --- Vectorization ---------------------------------------------------------
+
+DIM = 256  # per text; an input vector holds the idea and the plan side by side
+CHAR_NGRAMS = (3, 4)
+# Calibrated on reworded / non-duplicate pairs (see tests/test_similarity.py).
+IDEA_WEIGHT = 0.7
+
+def _hash_into(vec, feature, weight):
+    h = zlib.crc32(feature.encode("utf-8"))
+    vec[h % len(vec)] += weight if (h >> 31) & 1 else -weight
+
+def text_vector(text: str, dim: int = DIM) -> np.ndarray:
+    """
+    L2-normalized signed feature-hashing vector of a text's content words:
+    each word adds its stem and its character n-grams, scaled so that every
+    word carries the same weight however long it is.
+    """
+    vec = np.zeros(dim, dtype=np.float32)
+    for word in content_words(text):
+        _hash_into(vec, "w:" + _stem(word), 1.0)
+        padded = f" {word} "
+        grams = [padded[i:i + n] for n in CHAR_NGRAMS for i in range(len(padded) - n + 1)]
+        for gram in grams:
+            _hash_into(vec, "c:" + gram, 1.0 / math.sqrt(len(grams)))
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+def input_vector(idea: str, launch_plan: str, idea_weight: float = IDEA_WEIGHT, dim: int = DIM) -> np.ndarray:
+    """
+    Idea and plan vectors side by side, scaled so that the dot product of two
+    input vectors is `idea_weight * idea_cosine + (1 - idea_weight) * plan_cosine`.
+    """
+    return np.concatenate([
+        math.sqrt(idea_weight) * text_vector(idea, dim),
+        math.sqrt(1.0 - idea_weight) * text_vector(launch_plan, dim),
+    ])
+
+# --- Index -----------------------------------------------------------------
+
+class SimilarityIndex:
+    """
+    Near-duplicate index over (idea, launch_plan) pairs with an attached payload.
+
+    A stored entry matches when `word_match` of the ideas is at least
+    `threshold` and of the launch plans at least `plan_threshold`; its score is
+    their `idea_weight`-weighted mean. Only the `rerank` entries with the
+    highest `input_vector` cosine (at least `candidate_threshold`) are checked.
+    Below `exact_below` entries those come from one matrix-vector product.
+    Above it they come from `n_tables` LSH tables, probing the query's bucket
+    and its `probes` nearest neighbours in each. Every table hashes on enough
+    random hyperplanes to keep buckets near `bucket_size` entries, so the bits
+    grow with the corpus and a lookup scans a roughly constant number of
+    entries instead of a fixed fraction of them. Safe to share across threads.
+
+    With `max_entries` set, adding past it evicts the least recently added or
+    matched entry and passes its key and payload to `on_evict`. Removed
+    entries are skipped until they outnumber the live ones, then the arrays
+    and tables are compacted.
+    """
+
+    def __init__(self, threshold=0.76, plan_threshold=0.5, idea_weight=IDEA_WEIGHT, candidate_threshold=0.5,
+                 rerank=20, dim=DIM, n_tables=20, bucket_size=16, min_bits=8, max_bits=24, probes=4,
+                 exact_below=5000, max_entries=None, on_evict=None, seed=0):
+        self.threshold = threshold
+        self.plan_threshold = plan_threshold
+        self.idea_weight = idea_weight
+        self.candidate_threshold = candidate_threshold
+        self.rerank = rerank
+        self.dim = dim
+        self.bucket_size = bucket_size
+        self.min_bits = min_bits
+        self.max_bits = max_bits
+        self.probes = probes
+        self.exact_below = exact_below
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((n_tables, max_bits, 2 * dim)).astype(np.float32)
+        self._bit_weights = 1 << np.arange(max_bits, dtype=np.int64)
+        self._bits = min_bits
+        self._tables = [{} for _ in range(n_tables)]  # masked signature -> array of entry ids
+        # float16 keeps 100k x 512 vectors at ~100 MB
+        self._vectors = np.zeros((64, 2 * dim), dtype=np.float16)
+        # full max_bits signature per table, so tables can be re-bucketed without re-hashing
+        self._signatures = np.zeros((64, n_tables), dtype=np.int32)
+        # last add or match of each entry, on `_clock`; removed entries never come up as least recent
+        self._last_used = np.zeros(64, dtype=np.int64)
+        self._clock = 0
+        self._texts = []  # None once removed
+        self._payloads = []
+        self._entry_keys = []
+        self._keys = {}
+        self._removed = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._payloads) - self._removed
+
+    def _bits_for(self, n):
+        return min(self.max_bits, max(self.min_bits, math.ceil(math.log2(max(n, 1) / self.bucket_size))))
+
+    def _rebuild_tables(self):
+        n = len(self._payloads)
+        mask = (1 << self._bits) - 1
+        for t, table in enumerate(self._tables):
+            table.clear()
+            keys = self._signatures[:n, t] & mask
+            order = np.argsort(keys, kind="stable").astype(np.intc)
+            uniq, starts = np.unique(keys[order], return_index=True)
+            for key, ids in zip(uniq, np.split(order, starts[1:])):
+                table[int(key)] = array("i", ids.tobytes())
+
+    def _touch_locked(self, idx):
+        self._clock += 1
+        self._last_used[idx] = self._clock
+
+    def add(self, idea, launch_plan, payload, key=None):
+        """Index a payload. Adding again with the same `key` replaces the earlier payload."""
+        vec = input_vector(idea, launch_plan, self.idea_weight, self.dim)
+        signatures = ((self._planes @ vec) > 0).astype(np.int64) @ self._bit_weights
+        with self._lock:
+            if key is not None and key in self._keys:
+                idx = self._keys[key]
+                self._payloads[idx] = payload
+                self._touch_locked(idx)
+                return
+            idx = len(self._payloads)
+            if key is not None:
+                self._keys[key] = idx
+            if idx == len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+                self._signatures = np.concatenate([self._signatures, np.zeros_like(self._signatures)])
+                self._last_used = np.concatenate([self._last_used, np.zeros_like(self._last_used)])
+            self._vectors[idx] = vec
+            self._signatures[idx] = signatures
+            self._touch_locked(idx)
+            self._texts.append((idea, launch_plan))
+            self._payloads.append(payload)
+            self._entry_keys.append(key)
+
+            bits = self._bits_for(idx + 1)
+            if bits != self._bits:
+                self._bits = bits
+                self._rebuild_tables()
+            else:
+                mask = (1 << bits) - 1
+                for table, sig in zip(self._tables, signatures):
+                    table.setdefault(int(sig) & mask, array("i")).append(idx)
+
+            evicted = []
+            while self.max_entries is not None and len(self) > self.max_entries:
+                oldest = int(np.argmin(self._last_used[:len(self._payloads)]))
+                evicted.append((self._entry_keys[oldest], self._payloads[oldest]))
+                self._remove_locked(oldest)
+            self._maybe_compact_locked()
+        if self.on_evict:
+            for evicted_key, evicted_payload in evicted:
+                self.on_evict(evicted_key, evicted_payload)
+
+    def remove(self, key):
+        """Drop the entry added with `key`. Returns False if there is none."""
+        with self._lock:
+            idx = self._keys.get(key)
+            if idx is None:
+                return False
+            self._remove_locked(idx)
+            self._maybe_compact_locked()
+            return True
+
+    def _remove_locked(self, idx):
+        key = self._entry_keys[idx]
+        if key is not None:
+            del self._keys[key]
+        self._texts[idx] = self._payloads[idx] = self._entry_keys[idx] = None
+        self._vectors[idx] = 0
+        self._last_used[idx] = np.iinfo(np.int64).max
+        self._removed += 1
+
+    def _maybe_compact_locked(self):
+        if self._removed <= max(len(self), 64):
+            return
+        alive = np.array([i for i, texts in enumerate(self._texts) if texts is not None], dtype=np.intc)
+        n = len(alive)
+        self._vectors[:n] = self._vectors[alive]
+        self._signatures[:n] = self._signatures[alive]
+        self._last_used[:n] = self._last_used[alive]
+        self._texts = [self._texts[i] for i in alive]
+        self._payloads = [self._payloads[i] for i in alive]
+        self._entry_keys = [self._entry_keys[i] for i in alive]
+        self._keys = {key: i for i, key in enumerate(self._entry_keys) if key is not None}
+        self._removed = 0
+        self._bits = self._bits_for(n)
+        self._rebuild_tables()
+
+    def _probe(self, projections):
+        """Entry ids sharing a bucket with the query, or one of its `probes` closest buckets, in any table."""
+        proj = projections[:, :self._bits]
+        base = (proj > 0).astype(np.int64) @ self._bit_weights[:self._bits]
+        # the bits most likely to differ for a near neighbour are those the query barely set
+        flips = np.argsort(np.abs(proj), axis=1)[:, :self.probes]
+        found = []
+        for table, sig, bits in zip(self._tables, base, flips):
+            for key in (int(sig), *(int(sig) ^ (1 << int(b)) for b in bits)):
+                bucket = table.get(key)
+                if bucket:
+                    found.append(np.frombuffer(bucket, dtype=np.intc).copy())
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.intc)
+
+    def search(self, idea, launch_plan, k=1, threshold=None):
+        """Up to `k` (score, payload) pairs that pass both thresholds, best first."""
+        threshold = self.threshold if threshold is None else threshold
+        vec = input_vector(idea, launch_plan, self.idea_weight, self.dim)
+        projections = self._planes @ vec
+
+        with self._lock:
+            if not self._payloads:
+                return []
+            if len(self._payloads) < self.exact_below:
+                candidates = np.arange(len(self._payloads))
+            else:
+                candidates = self._probe(projections)
+            cosines = self._vectors[candidates].astype(np.float32) @ vec
+            order = np.argsort(-cosines)[:self.rerank]
+            entries = [
+                (int(candidates[i]), self._texts[candidates[i]], self._payloads[candidates[i]])
+                for i in order
+                if cosines[i] >= self.candidate_threshold and self._texts[candidates[i]] is not None
+            ]
+
+        idea_words, plan_words = content_words(idea), content_words(launch_plan)
+        hits = []
+        for idx, (other_idea, other_plan), payload in entries:
+            idea_score = match_words(idea_words, content_words(other_idea))
+            if idea_score < threshold:
+                continue
+            plan_score = match_words(plan_words, content_words(other_plan))
+            if plan_score < self.plan_threshold:
+                continue
+            hits.append((self.idea_weight * idea_score + (1.0 - self.idea_weight) * plan_score, idx, payload))
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        with self._lock:
+            for _, idx, payload in hits[:k]:
+                # skip entries removed or compacted away since the scan
+                if idx < len(self._payloads) and self._payloads[idx] is payload:
+                    self._touch_locked(idx)
+        return [(score, payload) for score, _, payload in hits[:k]]
+
+    def lookup(self, idea, launch_plan, threshold=None):
+        """Best near-duplicate as (score, payload), or None."""
+        hits = self.search(idea, launch_plan, k=1, threshold=threshold)
+        return hits[0] if hits else None
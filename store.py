@@ -0,0 +1,226 @@
+"""
+Shared, content-addressed storage for report text.
+
+Sessions don't keep report strings themselves. They bind named slots
+(e.g. "segmentation") to content keys in one process-wide `ReportStore`, so
+identical text is held once. Blobs nobody has read for a while are kept
+zlib-compressed, and idle sessions are released when the store grows past
+its memory budget.
+"""
+import threading
+import time
+import zlib
+
+from pipeline import content_hash
+
+def _default_budget():
+    """Half the container memory limit (cgroup v2/v1) if known, else 512 MB."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                limit = int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        if limit < 1 << 50:  # "unlimited" is reported as a huge number
+            return limit // 2
+    return 512 * 1024 * 1024
+
+class _Blob:
+    __slots__ = ("text", "packed", "size", "last_access", "holders")
+
+    def __init__(self, text):
+        self.text = text
+        self.packed = None
+        self.size = len(text.encode("utf-8"))
+        self.last_access = time.monotonic()
+        self.holders = set()
+
+    @property
+    def resident_bytes(self):
+        return (self.size if self.text is not None else 0) + (len(self.packed) if self.packed else 0)
+
+class ReportStore:
+    """
+    Refcounted text blobs keyed by content hash, bound to per-holder slots.
+
+    A holder is usually a browser session, or one remembered analysis of the
+    similarity index; both are evicted the same way. `on_evict(holder_id)` is
+    called after a sweep releases a holder.
+    """
+
+    def __init__(self, hot_seconds=300, idle_seconds=1800, expire_seconds=6 * 3600, budget_bytes=None,
+                 sweep_interval=30, on_evict=None):
+        self.hot_seconds = hot_seconds
+        self.idle_seconds = idle_seconds
+        self.expire_seconds = expire_seconds
+        self.budget_bytes = budget_bytes or _default_budget()
+        self.sweep_interval = sweep_interval
+        self.on_evict = on_evict
+        self._blobs = {}
+        self._holders = {}  # holder id -> {"slots": {slot: key}, "last_seen": t}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.evicted_holders = 0
+
+    # --- holders ---
+
+    def _holder(self, holder_id):
+        holder = self._holders.get(holder_id)
+        if holder is None:
+            holder = self._holders[holder_id] = {"slots": {}, "last_seen": time.monotonic()}
+        return holder
+
+    def touch(self, holder_id):
+        with self._lock:
+            self._holder(holder_id)["last_seen"] = time.monotonic()
+
+    def release(self, holder_id):
+        """Drop every slot of a holder; blobs no one else holds are freed."""
+        with self._lock:
+            self._release_locked(holder_id)
+
+    def _release_locked(self, holder_id):
+        """Returns the number of resident bytes freed."""
+        holder = self._holders.pop(holder_id, None)
+        if not holder:
+            return 0
+        return sum(self._drop_ref_locked(holder_id, key) for key in set(holder["slots"].values()))
+
+    def _drop_ref_locked(self, holder_id, key):
+        blob = self._blobs.get(key)
+        if blob is None:
+            return 0
+        blob.holders.discard(holder_id)
+        if blob.holders:
+            return 0
+        del self._blobs[key]
+        return blob.resident_bytes
+
+    # --- slots ---
+
+    def put(self, holder_id, slot, text, key=None):
+        """Store `text` (deduplicated by content) and bind it to `slot`. Returns its key."""
+        key = key or content_hash(text)
+        with self._lock:
+            if key not in self._blobs:
+                self._blobs[key] = _Blob(text)
+            self._bind_locked(holder_id, slot, key)
+        self.maybe_sweep()
+        return key
+
+    def bind(self, holder_id, slot, key):
+        """Bind `slot` to an existing blob. Returns False if the blob is gone."""
+        with self._lock:
+            if key not in self._blobs:
+                return False
+            self._bind_locked(holder_id, slot, key)
+            return True
+
+    def _bind_locked(self, holder_id, slot, key):
+        holder = self._holder(holder_id)
+        holder["last_seen"] = time.monotonic()
+        old = holder["slots"].get(slot)
+        holder["slots"][slot] = key
+        self._blobs[key].holders.add(holder_id)
+        if old and old != key and old not in holder["slots"].values():
+            self._drop_ref_locked(holder_id, old)
+
+    def unbind(self, holder_id, slot):
+        """Clear `slot`; its blob is freed if nothing else holds it."""
+        with self._lock:
+            holder = self._holders.get(holder_id)
+            key = holder["slots"].pop(slot, None) if holder else None
+            if key and key not in holder["slots"].values():
+                self._drop_ref_locked(holder_id, key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._blobs
+
+    def get(self, key):
+        """Text for `key`, or None if it was never stored or has been freed."""
+        if not key:
+            return None
+        with self._lock:
+            blob = self._blobs.get(key)
+            if blob is None:
+                return None
+            blob.last_access = time.monotonic()
+            if blob.text is None:
+                # back to hot; the packed copy is kept so re-cooling is free
+                blob.text = zlib.decompress(blob.packed).decode("utf-8")
+            return blob.text
+
+    # --- housekeeping ---
+
+    def maybe_sweep(self):
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def sweep(self):
+        """
+        Compress cold blobs and release long-expired holders, then release idle
+        holders (least recently seen first) while over the memory budget.
+        """
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            self._last_sweep = now
+            for blob in self._blobs.values():
+                if blob.text is not None and now - blob.last_access > self.hot_seconds:
+                    if blob.packed is None:
+                        blob.packed = zlib.compress(blob.text.encode("utf-8"), 6)
+                    blob.text = None
+
+            idle = sorted(
+                (h["last_seen"], hid) for hid, h in self._holders.items()
+                if now - h["last_seen"] > self.idle_seconds
+            )
+            resident = self._resident_bytes_locked()
+            # oldest first, so expired holders always go before the budget check stops us
+            for last_seen, hid in idle:
+                if now - last_seen <= self.expire_seconds and resident <= self.budget_bytes:
+                    break
+                resident -= self._release_locked(hid)
+                self.evicted_holders += 1
+                evicted.append(hid)
+        if self.on_evict:
+            for hid in evicted:
+                self.on_evict(hid)
+
+    def _resident_bytes_locked(self):
+        return sum(blob.resident_bytes for blob in self._blobs.values())
+
+    def memory_report(self, top=10):
+        """
+        Totals plus the biggest holders. A blob shared by several holders is
+        split evenly between them, so per-holder bytes add up to the total.
+        """
+        now = time.monotonic()
+        with self._lock:
+            per_holder = dict.fromkeys(self._holders, 0.0)
+            for blob in self._blobs.values():
+                share = blob.resident_bytes / len(blob.holders)
+                for hid in blob.holders:
+                    per_holder[hid] = per_holder.get(hid, 0.0) + share
+            holders = [
+                {
+                    "holder": hid,
+                    "bytes": int(per_holder.get(hid, 0)),
+                    "slots": len(h["slots"]),
+                    "idle_s": int(now - h["last_seen"]),
+                }
+                for hid, h in self._holders.items()
+            ]
+            hot = [b for b in self._blobs.values() if b.text is not None]
+            return {
+                "holders": len(self._holders),
+                "blobs": len(self._blobs),
+                "hot_blobs": len(hot),
+                "resident_bytes": self._resident_bytes_locked(),
+                "uncompressed_bytes": sum(b.size for b in self._blobs.values()),
+                "budget_bytes": self.budget_bytes,
+                "evicted_holders": self.evicted_holders,
+                "per_holder": per_holder,
+                "top": sorted(holders, key=lambda h: h["bytes"], reverse=True)[:top],
+            }
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+import batch
+import pipeline
+from batch import _status, load_completed, read_rows, run_batch
+
+@pytest.fixture
+def model(monkeypatch):
+    """Stub `_limited_call`: records (stage, prompt) and answers per stage; a prompt containing "fail" errors."""
+    calls = []
+
+    async def limited_call(prompt, stage, limiter):
+        calls.append((stage, prompt))
+        return f"Error: {stage} failed" if "fail" in prompt else f"{stage} text"
+
+    monkeypatch.setattr(pipeline, "_limited_call", limited_call)
+    return calls
+
+def write(path, text, encoding="utf-8"):
+    path.write_text(text, encoding=encoding)
+    return str(path)
+
+def output_records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+# --- read_rows ---
+
+def test_csv_with_bom_and_blank_fields(tmp_path, capsys):
+    path = write(tmp_path / "ideas.csv", "idea,launch_plan,id\ncoffee, instagram ,c1\n,missing idea,\ntea,,\n", "utf-8-sig")
+    assert list(read_rows(path)) == [{"id": "c1", "idea": "coffee", "launch_plan": "instagram"}]
+    assert capsys.readouterr().err.count("Skipping row") == 2
+
+def test_jsonl_rows_get_a_stable_id(tmp_path):
+    path = write(tmp_path / "ideas.jsonl", '{"idea": "coffee", "launch_plan": "instagram"}\n\n{"id": 7, "idea": "tea", "launch_plan": "shop"}\n')
+    rows = list(read_rows(path))
+    assert rows[0]["id"] == pipeline.input_key("coffee", "instagram")
+    assert rows[1]["id"] == "7"
+
+# --- checkpoint ---
+
+def test_load_completed_skips_failures_and_a_half_written_line(tmp_path):
+    path = write(tmp_path / "out.jsonl", '{"id": "a", "status": "ok"}\n{"id": "b", "status": "error"}\n{"id": "c", "sta')
+    assert load_completed(path) == {"a"}
+
+def test_load_completed_without_output_file(tmp_path):
+    assert load_completed(str(tmp_path / "missing.jsonl")) == set()
+
+@pytest.mark.parametrize("result, status", [
+    ({"segmentation_output": "text", "target_lens_output": "text"}, "ok"),
+    ({"segmentation_output": "text", "target_lens_output": "Error: quota"}, "error"),
+    ({"segmentation_output": None}, "ok"),
+])
+def test_status(result, status):
+    assert _status(result) == status
+
+# --- run_batch ---
+
+def rows(*ideas):
+    return [{"id": idea, "idea": idea, "launch_plan": "plan"} for idea in ideas]
+
+def test_run_batch_skips_done_and_duplicate_ids(tmp_path, model):
+    out = tmp_path / "out.jsonl"
+    counts = asyncio.run(run_batch(iter(rows("a", "b", "a", "c")), str(out), concurrency=2,
+                                   requests_per_minute=0, done={"b"}))
+    assert counts == {"ok": 2, "error": 0, "skipped": 1, "duplicates": 1}
+    assert sorted(r["id"] for r in output_records(out)) == ["a", "c"]
+    assert sum(stage == "segmentation" for stage, _ in model) == 2
+
+def test_rerun_retries_only_failed_rows(tmp_path, model):
+    out = tmp_path / "out.jsonl"
+    asyncio.run(run_batch(rows("good", "fail"), str(out), requests_per_minute=0))
+    assert {r["id"]: r["status"] for r in output_records(out)} == {"good": "ok", "fail": "error"}
+
+    model.clear()
+    counts = asyncio.run(run_batch(rows("good", "fail"), str(out), requests_per_minute=0, done=load_completed(str(out))))
+    assert counts == {"ok": 0, "error": 1, "skipped": 1, "duplicates": 0}
+    assert {stage for stage, _ in model} == {"segmentation"}
+
+def test_main_streams_input_and_reports_counts(tmp_path, model, monkeypatch, capsys):
+    monkeypatch.setattr(batch, "configure_gemini", lambda: None)
+    source = write(tmp_path / "ideas.csv", "idea,launch_plan\ncoffee,instagram\ncoffee,instagram\n")
+    out = str(tmp_path / "out.jsonl")
+    assert batch.main([source, "-o", out, "--rpm", "0"]) == 0
+    assert "1 ok, 0 failed, 0 already done, 1 duplicates" in capsys.readouterr().err
+    assert batch.main([source, "-o", out, "--rpm", "0"]) == 0
+    assert "0 ok, 0 failed, 2 already done" in capsys.readouterr().err
+
+def test_main_without_usable_rows(tmp_path, model, monkeypatch):
+    monkeypatch.setattr(batch, "configure_gemini", lambda: None)
+    source = write(tmp_path / "ideas.csv", "idea,launch_plan\n,\n")
+    assert batch.main([source, "-o", str(tmp_path / "out.jsonl")]) == 1
@@ -0,0 +1,49 @@
+import io
+
+import pytest
+
+from export import Section, _markup, build_export, write_pdf
+
+def sections(text):
+    return [Section("Segmentation", "key", lambda: text, lambda: "<p>html</p>")]
+
+@pytest.mark.parametrize("text, expected", [
+    ("GFM __bold__ text", "GFM **bold** text"),
+    ("from 2023--2024 -- roughly", "from 2023\\--2024 \\-- roughly"),
+    ("user__id", "user\\__id"),
+    ("C:\\dir", "C:\\\\dir"),
+    ("**kept** and *dropped*", "**kept** and dropped"),
+])
+def test_markup_escapes_fpdf_only_markers(text, expected):
+    assert _markup(text) == expected
+
+@pytest.mark.parametrize("text", [
+    "Some __bold__, --underlined-- and 2023--2024 text",
+    "* __Bold lead:__ detail -- more",
+    "|---|---|\n|:--|--:|",  # separator rows only
+    "| only | header |\n|---|---|",
+])
+def test_pdf_handles_model_markdown(text):
+    out = io.BytesIO()
+    write_pdf(out, "Report", sections(text), [("Startup Idea", "cold brew")])
+    assert out.getvalue().startswith(b"%PDF")
+
+def test_markdown_export_includes_inputs_and_sections():
+    data = build_export("Markdown", "Report", sections("## Segments\n- one"), [("Startup Idea", "cold brew")])
+    text = data.decode("utf-8")
+    assert text.startswith("# Report\n")
+    assert "**Startup Idea:** cold brew" in text and "## Segments\n- one" in text
+
+def test_artifacts_are_cached_within_the_byte_limit(monkeypatch):
+    import export
+    monkeypatch.setattr(export, "_ARTIFACTS", export.OrderedDict())
+    monkeypatch.setattr(export, "_artifact_bytes", 0)
+    monkeypatch.setattr(export, "MAX_CACHED_ARTIFACT_BYTES", 2500)
+    first = build_export("Markdown", "Report", sections("a" * 1000), [])
+    assert build_export("Markdown", "Report", sections("a" * 1000), []) is first
+    build_export("HTML", "Report", sections("b" * 1000), [])
+    stats = export.cache_stats()
+    assert stats["artifacts"] == 2 and stats["bytes"] <= 2500
+    build_export("Markdown", "Other", sections("c" * 1000), [])
+    stats = export.cache_stats()
+    assert stats["bytes"] <= 2500 and stats["artifacts"] < 3
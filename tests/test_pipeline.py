@@ -0,0 +1,359 @@
+import asyncio
+
+import pytest
+
+from pipeline import STAGE_ORDER, _run_chain, refresh_stages, stage_hash
+
+def inputs(idea="cold brew coffee", launch_plan="instagram"):
+    return {"idea": idea, "launch_plan": launch_plan}
+
+class FakeModel:
+    """`generate` stub: records calls and answers from `replies` (default: a text per stage)."""
+
+    def __init__(self, **replies):
+        self.replies = replies
+        self.calls = []
+
+    def __call__(self, stage, values):
+        self.calls.append((stage, dict(values)))
+        reply = self.replies.get(stage, f"{stage} for {values.get('idea')}")
+        return reply(values) if callable(reply) else reply
+
+    @property
+    def stages(self):
+        return [stage for stage, _ in self.calls]
+
+# --- stage_hash ---
+
+def test_stage_hash_depends_only_on_stage_inputs():
+    values = {**inputs(), "segmentation": "seg", "target_lens": "tl"}
+    h = stage_hash("target_lens", values)
+    assert stage_hash("target_lens", {**values, "idea": "tea", "target_lens": "other"}) == h
+    assert stage_hash("target_lens", {**values, "segmentation": "seg 2"}) != h
+    assert stage_hash("market_radar", values) != h
+
+def test_stage_hash_separates_inputs():
+    assert stage_hash("segmentation", inputs("ab", "c")) != stage_hash("segmentation", inputs("a", "bc"))
+
+# --- refresh_stages ---
+
+def test_first_refresh_runs_every_stage():
+    values, hashes, model = inputs(), {}, FakeModel()
+    assert refresh_stages(values, hashes, model) == list(STAGE_ORDER)
+    assert model.stages == list(STAGE_ORDER)
+    assert set(hashes) == set(STAGE_ORDER)
+
+def test_unchanged_inputs_make_no_calls():
+    values, hashes = inputs(), {}
+    refresh_stages(values, hashes, FakeModel())
+    model = FakeModel()
+    assert refresh_stages(values, hashes, model) == []
+    assert model.calls == []
+
+def test_forced_stage_reruns_alone():
+    values, hashes = inputs(), {}
+    refresh_stages(values, hashes, FakeModel())
+    model = FakeModel(target_lens="new target lens")
+    assert refresh_stages(values, hashes, model, force=("target_lens",)) == ["target_lens"]
+    assert values["target_lens"] == "new target lens"
+
+def test_identical_rerun_keeps_dependents_cached():
+    values, hashes = inputs(), {}
+    refresh_stages(values, hashes, FakeModel())
+    model = FakeModel()
+    assert refresh_stages(values, hashes, model, force=("segmentation",)) == ["segmentation"]
+
+def test_changed_segmentation_reruns_dependents():
+    values, hashes = inputs(), {}
+    refresh_stages(values, hashes, FakeModel())
+    model = FakeModel(segmentation="a different segmentation")
+    assert refresh_stages(values, hashes, model, force=("segmentation",)) == list(STAGE_ORDER)
+    assert all(v["segmentation"] == "a different segmentation" for s, v in model.calls if s != "segmentation")
+
+def test_changed_input_reruns_everything():
+    values, hashes = inputs(), {}
+    refresh_stages(values, hashes, FakeModel())
+    values["idea"] = "masala chai"
+    model = FakeModel()
+    assert refresh_stages(values, hashes, model) == list(STAGE_ORDER)
+
+@pytest.mark.parametrize("reply", ["Error: quota exceeded", "", "   ", None])
+def test_failed_segmentation_skips_dependents(reply):
+    values, hashes, model = inputs(), {}, FakeModel(segmentation=reply)
+    refresh_stages(values, hashes, model)
+    assert model.stages == ["segmentation"]
+    assert all(values[stage].startswith("Error:") for stage in STAGE_ORDER)
+    assert hashes == {}
+
+def test_empty_stage_output_becomes_error_and_is_retried():
+    values, hashes = inputs(), {}
+    refresh_stages(values, hashes, FakeModel(market_radar=""))
+    assert values["market_radar"].startswith("Error:")
+    assert "market_radar" not in hashes
+
+    model = FakeModel()
+    assert refresh_stages(values, hashes, model) == ["market_radar"]
+    assert not values["market_radar"].startswith("Error:")
+
+def test_missing_upstream_output_is_not_sent_to_the_model():
+    values, hashes = {**inputs(), "segmentation": "seg"}, {}
+    refresh_stages(values, hashes, FakeModel())
+    values["segmentation"] = None
+    hashes.pop("segmentation")
+    model = FakeModel(segmentation="")
+    refresh_stages(values, hashes, model)
+    assert model.stages == ["segmentation"]
+
+def test_on_stage_called_before_each_call():
+    seen = []
+    model = FakeModel()
+    refresh_stages(inputs(), {}, model, on_stage=lambda stage: seen.append((stage, len(model.calls))))
+    assert seen == [(stage, i) for i, stage in enumerate(STAGE_ORDER)]
+
+class Interrupted(Exception):
+    """Stands in for Streamlit stopping the script at an st.* call."""
+
+class Session:
+    """What run_pending_generation keeps across reruns: saved outputs and their hashes."""
+
+    def __init__(self):
+        self.outputs, self.hashes = {}, {}
+
+    def refresh(self, idea, model, stop_before=None):
+        values = {**inputs(idea), **self.outputs}
+        hashes = dict(self.hashes)
+
+        def on_stage(stage):
+            if stage == stop_before:
+                raise Interrupted
+
+        def on_stage_done(stage):
+            self.outputs[stage] = values[stage]
+            self.hashes = dict(hashes)
+
+        return refresh_stages(values, hashes, model, on_stage=on_stage, on_stage_done=on_stage_done)
+
+def test_interrupted_refresh_never_saves_a_hash_without_its_output():
+    session = Session()
+    session.refresh("old idea", FakeModel())
+    with pytest.raises(Interrupted):
+        session.refresh("new idea", FakeModel(), stop_before="target_lens")
+    assert session.outputs["segmentation"] == "segmentation for new idea"
+
+    model = FakeModel()
+    assert session.refresh("new idea", model) == ["target_lens", "market_radar"]
+    assert all(session.outputs[stage] == f"{stage} for new idea" for stage in STAGE_ORDER)
+
+def test_interrupted_before_first_call_saves_nothing():
+    session = Session()
+    session.refresh("old idea", FakeModel())
+    saved = dict(session.outputs), dict(session.hashes)
+    with pytest.raises(Interrupted):
+        session.refresh("new idea", FakeModel(), stop_before="segmentation")
+    assert (session.outputs, session.hashes) == saved
+    assert session.refresh("new idea", FakeModel()) == list(STAGE_ORDER)
+
+# --- _run_chain ---
+
+def test_run_chain_stops_after_empty_segmentation():
+    calls = []
+
+    async def call_stage(stage, values):
+        calls.append(stage)
+        return "" if stage == "segmentation" else "text"
+
+    result = asyncio.run(_run_chain("idea", "plan", call_stage))
+    assert calls == ["segmentation"]
+    assert all(v.startswith("Error:") for v in result.values())
+
+def test_run_chain_reports_empty_downstream_as_error():
+    async def call_stage(stage, values):
+        return "" if stage == "market_radar" else f"{stage} text"
+
+    result = asyncio.run(_run_chain("idea", "plan", call_stage))
+    assert result["target_lens_output"] == "target_lens text"
+    assert result["market_radar_output"].startswith("Error:")
+
+# --- generate_hedged_async ---
+
+def fake_attempts(monkeypatch, **behaviour):
+    """Stub `_streamed_attempt`: per model, (seconds before the first token, seconds after it, reply or exception)."""
+    import pipeline
+
+    started = []
+
+    async def attempt(prompt, model_name, first_token):
+        started.append(model_name)
+        before, after, reply = behaviour[model_name]
+        await asyncio.sleep(before)
+        first_token.set()
+        await asyncio.sleep(after)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setattr(pipeline, "_streamed_attempt", attempt)
+    return started
+
+def hedge_policy():
+    from pipeline import HedgePolicy
+    return HedgePolicy(default_delay=0.05, min_delay=0.0, fallback_models={"segmentation": "backup"})
+
+def test_fast_primary_is_not_hedged(monkeypatch):
+    from pipeline import MODEL_NAME, generate_hedged_async
+    started = fake_attempts(monkeypatch, **{MODEL_NAME: (0.0, 0.0, "primary")})
+    policy = hedge_policy()
+    assert asyncio.run(generate_hedged_async("p", "segmentation", policy)) == "primary"
+    assert started == [MODEL_NAME]
+    assert policy.summary()["segmentation"]["hedged"] == 0
+
+def test_slow_primary_loses_to_backup(monkeypatch):
+    from pipeline import MODEL_NAME, generate_hedged_async
+    started = fake_attempts(monkeypatch, **{MODEL_NAME: (1.0, 0.0, "primary"), "backup": (0.0, 0.02, "backup")})
+    policy = hedge_policy()
+    assert asyncio.run(generate_hedged_async("p", "segmentation", policy)) == "backup"
+    assert started == [MODEL_NAME, "backup"]
+    m = policy.summary()["segmentation"]
+    assert (m["hedged"], m["hedge_wins"]) == (1, 1)
+    # the primary never streamed, so it needed at least the backup's streaming time more
+    assert m["saved"] >= 0.02
+    assert m["p99_unhedged"] >= m["p99"] + 0.02
+
+@pytest.mark.parametrize("limits", [(1, 0), (4, 60)], ids=["no free slot", "rpm spacing"])
+def test_hedge_skipped_when_limiter_is_full(monkeypatch, limits):
+    from pipeline import MODEL_NAME, RateLimiter, generate_hedged_async
+    started = fake_attempts(monkeypatch, **{MODEL_NAME: (0.1, 0.0, "primary"), "backup": (0.0, 0.0, "backup")})
+    policy = hedge_policy()
+
+    async def main():
+        limiter = RateLimiter(*limits)
+        async with limiter:
+            return await generate_hedged_async("p", "segmentation", policy, limiter)
+
+    assert asyncio.run(main()) == "primary"
+    assert started == [MODEL_NAME]
+    m = policy.summary()["segmentation"]
+    assert (m["hedged"], m["hedges_skipped"]) == (0, 1)
+
+def test_backup_holds_a_limiter_slot_until_done(monkeypatch):
+    from pipeline import MODEL_NAME, RateLimiter, generate_hedged_async
+    fake_attempts(monkeypatch, **{MODEL_NAME: (1.0, 0.0, "primary"), "backup": (0.0, 0.1, "backup")})
+    seen = []
+
+    async def main():
+        limiter = RateLimiter(max_concurrency=2, requests_per_minute=0)
+
+        async def watch():
+            await asyncio.sleep(0.1)
+            seen.append(limiter._semaphore.locked())
+
+        async with limiter:
+            watcher = asyncio.create_task(watch())
+            result = await generate_hedged_async("p", "segmentation", hedge_policy(), limiter)
+            await watcher
+        seen.append(limiter._semaphore._value)
+        return result
+
+    assert asyncio.run(main()) == "backup"
+    assert seen == [True, 2]
+
+def test_error_propagates_when_every_attempt_fails(monkeypatch):
+    from pipeline import MODEL_NAME, generate_hedged_async
+    fake_attempts(monkeypatch, **{MODEL_NAME: (0.1, 0.0, ValueError("primary")), "backup": (0.0, 0.0, ValueError("backup"))})
+    policy = hedge_policy()
+    with pytest.raises(ValueError):
+        asyncio.run(generate_hedged_async("p", "segmentation", policy))
+    assert policy.summary()["segmentation"]["failures"] == 1
+
+def test_failed_primary_falls_back_to_backup(monkeypatch):
+    from pipeline import MODEL_NAME, generate_hedged_async
+    fake_attempts(monkeypatch, **{MODEL_NAME: (0.1, 0.0, ValueError("primary")), "backup": (0.0, 0.2, "backup")})
+    assert asyncio.run(generate_hedged_async("p", "segmentation", hedge_policy())) == "backup"
+
+def test_limiter_slot_returned_when_cancelled_while_spacing():
+    from pipeline import RateLimiter
+
+    async def main():
+        limiter = RateLimiter(max_concurrency=2, requests_per_minute=60)
+        async with limiter:
+            pass
+        # the next start is a second away, so this waits in the spacing sleep
+        task = asyncio.create_task(limiter.__aenter__())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return limiter._semaphore._value
+
+    assert asyncio.run(main()) == 2
+
+# --- _streamed_attempt ---
+
+def stream_model(monkeypatch, chunks):
+    import pipeline
+
+    class Model:
+        def __init__(self, name):
+            pass
+
+        async def generate_content_async(self, prompt, stream):
+            async def gen():
+                for chunk in chunks:
+                    yield chunk
+            return gen()
+
+    monkeypatch.setattr(pipeline.genai, "GenerativeModel", Model)
+
+def chunk(text=None, finish=None, block=None):
+    from types import SimpleNamespace
+
+    from google.generativeai import protos
+    reason = protos.Candidate.FinishReason[finish] if finish else protos.Candidate.FinishReason(0)
+    feedback = SimpleNamespace(block_reason=protos.GenerateContentResponse.PromptFeedback.BlockReason[block] if block else 0)
+    parts = [SimpleNamespace(text=text)] if text is not None else []
+    candidates = [] if block else [SimpleNamespace(content=SimpleNamespace(parts=parts), finish_reason=reason)]
+    return SimpleNamespace(prompt_feedback=feedback, candidates=candidates)
+
+def run_attempt():
+    from pipeline import _FirstToken, _streamed_attempt
+    return asyncio.run(_streamed_attempt("p", "m", _FirstToken()))
+
+@pytest.mark.parametrize("finish", ["STOP", "MAX_TOKENS"])
+def test_streamed_attempt_joins_chunks(monkeypatch, finish):
+    stream_model(monkeypatch, [chunk("## Segments\n"), chunk("- one"), chunk(finish=finish)])
+    assert run_attempt() == "## Segments\n- one"
+
+@pytest.mark.parametrize("finish", ["SAFETY", "RECITATION", None])
+def test_streamed_attempt_raises_on_abnormal_finish(monkeypatch, finish):
+    stream_model(monkeypatch, [chunk("partial answer"), chunk(finish=finish)])
+    with pytest.raises(ValueError, match="finish_reason"):
+        run_attempt()
+
+def test_streamed_attempt_raises_on_blocked_prompt(monkeypatch):
+    stream_model(monkeypatch, [chunk(block="SAFETY")])
+    with pytest.raises(ValueError, match="blocked"):
+        run_attempt()
+
+# --- run_variants_async ---
+
+def test_variants_share_identical_stage_calls(monkeypatch):
+    import pipeline
+    from pipeline import run_variants_async
+    calls = []
+
+    async def limited_call(prompt, stage, limiter):
+        calls.append(stage)
+        await asyncio.sleep(0.01)
+        idea = prompt.split("**Startup Idea:** ")[1].split("\n")[0] if stage == "segmentation" else None
+        return f"segments of {idea}" if idea else f"{stage} of {prompt.split('segments of ')[1].split()[0]}"
+
+    monkeypatch.setattr(pipeline, "_limited_call", limited_call)
+    done = []
+    variants = [("coffee", "instagram"), ("tea", "instagram"), ("coffee", "instagram")]
+    results = asyncio.run(run_variants_async(variants, limiter=None, on_stage_done=lambda *e: done.append(e)))
+
+    assert sorted(calls) == sorted(["segmentation", "target_lens", "market_radar"] * 2)
+    assert [r["segmentation_output"] for r in results] == ["segments of coffee", "segments of tea", "segments of coffee"]
+    assert [r["target_lens_output"] for r in results] == ["target_lens of coffee", "target_lens of tea", "target_lens of coffee"]
+    # every variant still reports each of its stages
+    assert sorted((i, stage) for i, stage, _ in done) == sorted((i, s) for i in range(3) for s in STAGE_ORDER)
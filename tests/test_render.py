@@ -0,0 +1,72 @@
+import pytest
+
+from render import RENDER_STATS, cached_html, normalize_markdown, sanitize_html, to_html
+
+# --- sanitize_html ---
+
+@pytest.mark.parametrize("fragment, expected", [
+    ("<p>ok <strong>bold</strong></p>", "<p>ok <strong>bold</strong></p>"),
+    ("<script>alert(1)</script><p>x</p>", "<p>x</p>"),
+    ("<style>p{}</style>text", "text"),
+    ('<img src=x onerror="alert(1)">y', "y"),
+    ('<p onclick="steal()">x</p>', "<p>x</p>"),
+    ("<div><p>x</p></div>", "<p>x</p>"),
+    ("a < b &amp; c", "a &lt; b &amp; c"),
+])
+def test_sanitize_keeps_only_allowed_markup(fragment, expected):
+    assert sanitize_html(fragment) == expected
+
+def test_sanitize_filters_links():
+    assert sanitize_html('<a href="javascript:alert(1)">x</a>') == '<a target="_blank" rel="noopener noreferrer">x</a>'
+    assert sanitize_html('<a href="https://example.com" onclick="x">x</a>') == (
+        '<a href="https://example.com" target="_blank" rel="noopener noreferrer">x</a>'
+    )
+
+def test_sanitize_keeps_only_alignment_styles():
+    assert sanitize_html('<td style="text-align: center">x</td>') == '<td style="text-align: center">x</td>'
+    assert sanitize_html('<td style="background: url(x)">x</td>') == "<td>x</td>"
+
+# --- normalize_markdown / to_html ---
+
+def test_table_directly_after_text_renders_as_table():
+    text = "Segments:\n| A | B |\n|---|---|\n| 1 | 2 |\nSource: survey"
+    rendered = to_html(text)
+    assert "<table>" in rendered and "<td>1</td>" in rendered
+    assert "<p>Source: survey</p>" in rendered
+
+def test_list_directly_after_text_renders_as_list():
+    rendered = to_html("**Key segments:**\n* one\n* two")
+    assert rendered.startswith("<p><strong>Key segments:</strong></p>\n<ul>")
+    assert rendered.count("<li>") == 2
+
+def test_two_space_nesting_becomes_nested_lists():
+    rendered = to_html("* parent\n  * child\n    * grandchild\n* sibling")
+    assert rendered.count("<ul>") == 3
+    assert normalize_markdown("* parent\n  * child\n    * grandchild\n* sibling") == (
+        "* parent\n    * child\n        * grandchild\n* sibling"
+    )
+
+def test_items_under_numbered_list_nest():
+    assert normalize_markdown("1. step\n   - detail\n2. next") == "1. step\n    - detail\n2. next"
+    assert to_html("1. step\n   - detail\n2. next").count("<li>") == 3
+
+def test_only_a_list_starting_at_one_interrupts_text():
+    assert normalize_markdown("Grew 10% in\n2020. Then more.") == "Grew 10% in\n2020. Then more."
+    assert normalize_markdown("Steps:\n1. a") == "Steps:\n\n1. a"
+
+def test_rules_and_bold_lines_are_not_list_items():
+    assert normalize_markdown("text\n\n* * *\n**Bold:** x") == "text\n\n* * *\n**Bold:** x"
+
+def test_fenced_code_is_left_alone():
+    text = "Example:\n```\n| not | a table |\n  * not a list\n```"
+    assert normalize_markdown(text) == text
+
+# --- cached_html ---
+
+def test_cached_html_converts_only_on_miss():
+    store = {}
+    before = RENDER_STATS["conversions"]
+    first = cached_html("k", store.get, lambda: "# Title")
+    store["k"] = first
+    assert cached_html("k", store.get, lambda: pytest.fail("loaded text on a hit")) == first
+    assert RENDER_STATS["conversions"] == before + 1
@@ -0,0 +1,155 @@
+import pytest
+
+from similarity import SimilarityIndex, normalize_text, word_match
+
+# (idea, launch_plan) pairs a user could type for the same analysis ...
+REWORDED = [
+    (("cold brew coffee D2C in Bangalore", "instagram to young professionals"),
+     ("D2C cold-brew brand, Bengaluru", "instagram-first to young professionals")),
+    (("cold brew coffee D2C brand in Bangalore", "instagram ads targeting young professionals"),
+     ("D2C cold-brew brand, Bengaluru", "instagram-first to young professionals")),
+    (("Organic baby food subscription for urban parents", "Launch in Mumbai via Instagram and pediatrician tie-ups"),
+     ("Subscription service for organic baby food, targeting city parents",
+      "Mumbai launch with Instagram marketing and paediatrician partnerships")),
+    (("An app for booking home tutors for school kids", "Start in Pune with Facebook ads to parents"),
+     ("Home tutor booking app for school children", "Pune first, Facebook ads aimed at parents")),
+    (("Plant-based protein bars for gym goers", "Sell on Amazon and in gyms across Delhi"),
+     ("Plant based protein bars for people who go to the gym", "Amazon plus gym retail across Delhi")),
+    (("Electric scooter rental for college students", "Campus kiosks in Bangalore"),
+     ("Renting electric scooters to college students", "Kiosks on Bengaluru college campuses")),
+    (("Handmade soy candles", "Etsy and Instagram shop"),
+     ("Hand-made soy wax candles", "Instagram shop and Etsy")),
+    (("Ayurvedic skincare for men", "D2C website with influencer marketing"),
+     ("Ayurvedic skin care for men", "direct to consumer website, influencer marketing")),
+    (("Healthy millet snacks for office workers", "Quick commerce on Blinkit and Zepto in Hyderabad"),
+     ("Millet-based healthy snacks for office goers", "Blinkit and Zepto listings in Hyderabad")),
+    (("Premium pet grooming at home", "Gurgaon launch through Instagram and vet clinics"),
+     ("At-home premium grooming for pets", "Launch in Gurugram via Instagram and veterinary clinics")),
+    (("Cold pressed juice delivery", "Subscriptions in South Mumbai via WhatsApp"),
+     ("Cold-pressed juices delivered daily", "South Mumbai subscriptions over WhatsApp")),
+]
+
+# ... and pairs that need their own analysis, however close the wording.
+DIFFERENT = [
+    (("organic baby food subscription", "Launch in Mumbai via Instagram"),
+     ("organic pet food subscription", "Launch in Mumbai via Instagram")),
+    (("cold brew coffee D2C brand in Bangalore", "instagram ads targeting young professionals"),
+     ("cold brew coffee D2C brand in Bangalore", "B2B supply contracts with corporate offices in Delhi")),
+    (("Home tutor booking app for school kids", "Pune, Facebook ads to parents"),
+     ("Home cleaner booking app", "Pune, Facebook ads to parents")),
+    (("Plant-based protein bars for gym goers", "Sell on Amazon"),
+     ("Plant-based ice cream for kids", "Sell on Amazon")),
+    (("Handmade soy candles", "Etsy and Instagram shop"),
+     ("Handmade leather wallets", "Etsy and Instagram shop")),
+    (("Electric scooter rental for college students", "Campus kiosks in Bangalore"),
+     ("Electric scooter rental for college students", "Tier-2 city franchise model with dealers in Uttar Pradesh")),
+    (("Ayurvedic skincare for men", "D2C website with influencer marketing"),
+     ("Ayurvedic skincare for women", "D2C website with influencer marketing")),
+    (("Cold pressed juice delivery", "Subscriptions in South Mumbai via WhatsApp"),
+     ("Cold pressed juice bar franchise", "Malls in Chennai")),
+    (("Premium pet grooming at home", "Gurgaon launch through Instagram"),
+     ("Premium car detailing at home", "Gurgaon launch through Instagram")),
+    (("Millet snacks for office workers", "Blinkit and Zepto in Hyderabad"),
+     ("Millet snacks for office workers", "Export to UAE supermarkets through distributors")),
+]
+
+def matches(stored, query, **kwargs):
+    index = SimilarityIndex(**kwargs)
+    index.add(*stored, payload="stored")
+    return index.lookup(*query)
+
+# --- calibration ---
+
+@pytest.mark.parametrize("stored, query", DIFFERENT)
+def test_different_ideas_never_match(stored, query):
+    assert matches(stored, query) is None
+
+def test_most_rewordings_match():
+    found = sum(matches(stored, query) is not None for stored, query in REWORDED)
+    assert found >= 9
+
+def test_exact_resubmission_scores_one():
+    score, payload = matches(REWORDED[0][0], REWORDED[0][0])
+    assert payload == "stored"
+    assert score == pytest.approx(1.0)
+
+# --- normalization / word matching ---
+
+def test_aliases_bridge_spellings():
+    assert normalize_text("Cold-Brew in Bengaluru") == "coldbrew in bangalore"
+
+def test_short_words_match_on_stem_only():
+    assert word_match("skincare for men", "skincare for women") < 1.0
+    assert word_match("grooming for pets", "pet grooming") == 1.0
+
+def test_single_word_is_not_contained_in_a_longer_idea():
+    assert word_match("coffee", "cold brew coffee D2C brand in Bangalore") < 0.76
+
+# --- index ---
+
+def test_same_key_replaces_payload():
+    index = SimilarityIndex()
+    index.add("cold brew coffee", "instagram", "old", key="k")
+    index.add("cold brew coffee", "instagram", "new", key="k")
+    assert len(index) == 1
+    assert index.lookup("cold brew coffee", "instagram")[1] == "new"
+
+def corpus(n):
+    foods = "coffee tea juice snacks bars candles wallets sarees sneakers pickles spices bakery".split()
+    places = "mumbai delhi pune chennai hyderabad kolkata jaipur goa".split()
+    for i in range(n):
+        yield f"{foods[i % 12]} {foods[(i // 12) % 12]} store number{i}", f"launch in {places[i % 8]} via shop{i}"
+
+def test_lsh_bits_grow_with_the_corpus():
+    index = SimilarityIndex(bucket_size=4, min_bits=4)
+    for i, (idea, plan) in enumerate(corpus(1000)):
+        index.add(idea, plan, i)
+    assert index._bits == 8  # ceil(log2(1000 / 4))
+    assert sum(len(bucket) for bucket in index._tables[0].values()) == 1000
+
+def test_lsh_finds_what_exact_search_finds():
+    index = SimilarityIndex(exact_below=10**9)
+    entries = list(corpus(3000))
+    for i, (idea, plan) in enumerate(entries):
+        index.add(idea, plan, i)
+    queries = [(idea.replace(" store", ""), plan) for idea, plan in entries[::150]]
+    exact = [index.lookup(*q) for q in queries]
+    index.exact_below = 0
+    assert [index.lookup(*q) for q in queries] == exact
+    assert all(hit is not None for hit in exact)
+
+# --- removal and the size cap ---
+
+def test_removed_entry_is_not_found():
+    index = SimilarityIndex()
+    index.add("cold brew coffee", "instagram", "coffee", key="k")
+    assert index.remove("k") and not index.remove("k")
+    assert len(index) == 0
+    assert index.lookup("cold brew coffee", "instagram") is None
+
+def test_cap_evicts_least_recently_used():
+    evicted = []
+    index = SimilarityIndex(max_entries=3, on_evict=lambda key, payload: evicted.append(key))
+    entries = list(corpus(4))
+    for i, (idea, plan) in enumerate(entries[:3]):
+        index.add(idea, plan, i, key=f"k{i}")
+    assert index.lookup(*entries[0])[1] == 0  # a match counts as a use
+    index.add(*entries[3], 3, key="k3")
+    assert evicted == ["k1"] and len(index) == 3
+    assert index.lookup(*entries[1]) is None
+    assert index.lookup(*entries[0])[1] == 0
+
+@pytest.mark.parametrize("exact_below", [0, 10**9], ids=["lsh", "exact"])
+def test_lookups_survive_compaction(exact_below):
+    index = SimilarityIndex(max_entries=100, exact_below=exact_below)
+    entries = list(corpus(400))
+    for i, (idea, plan) in enumerate(entries):
+        index.add(idea, plan, i, key=i)
+    assert len(index) == 100 and len(index._payloads) <= 2 * 100 + 64
+    assert index.lookup(*entries[-1])[1] == 399
+    # evicted entries never come back; a near-duplicate that is still indexed may
+    hit = index.lookup(*entries[0])
+    assert hit is None or hit[1] >= 300
+    assert not index.remove(0) and index.remove(399)
+    hit = index.lookup(*entries[-1])
+    assert hit is None or hit[1] != 399
@@ -0,0 +1,86 @@
+import pytest
+
+import store as store_module
+from store import ReportStore
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(store_module.time, "monotonic", clock)
+    return clock
+
+def make_store(**kwargs):
+    kwargs = {"hot_seconds": 60, "idle_seconds": 100, "expire_seconds": 1000, "budget_bytes": 10**9,
+              "sweep_interval": 10**9, **kwargs}
+    return ReportStore(**kwargs)
+
+def test_identical_text_is_stored_once():
+    store = make_store()
+    key = store.put("a", "segmentation", "same text")
+    assert store.put("b", "segmentation", "same text") == key
+    assert store.memory_report()["blobs"] == 1
+    store.release("a")
+    assert store.get(key) == "same text"
+    store.release("b")
+    assert key not in store and store.get(key) is None
+
+def test_rebinding_a_slot_frees_the_old_text():
+    store = make_store()
+    old = store.put("a", "segmentation", "v1")
+    store.put("a", "segmentation", "v2")
+    assert old not in store
+    assert not store.bind("b", "segmentation", old)
+
+def test_sweep_compresses_cold_blobs_and_get_restores_them(clock):
+    store = make_store()
+    key = store.put("a", "segmentation", "report " * 200)
+    clock.now += 61
+    store.sweep()
+    report = store.memory_report()
+    assert report["hot_blobs"] == 0 and report["resident_bytes"] < report["uncompressed_bytes"]
+    assert store.get(key) == "report " * 200
+    assert store.memory_report()["hot_blobs"] == 1
+
+def test_idle_holders_kept_while_under_budget(clock):
+    store = make_store()
+    store.put("a", "segmentation", "text a")
+    clock.now += 101
+    store.sweep()
+    assert store.memory_report()["holders"] == 1
+
+def test_over_budget_releases_idle_holders_oldest_first(clock):
+    evicted = []
+    store = make_store(hot_seconds=10**6, budget_bytes=2500, on_evict=evicted.append)
+    for holder in "abc":
+        store.put(holder, "segmentation", holder * 1000)
+        clock.now += 10
+    store.touch("a")
+    clock.now += 101
+    store.sweep()
+    # "b" alone brings the store under budget; "a" was seen most recently
+    assert evicted == ["b"]
+    assert store.memory_report()["evicted_holders"] == 1
+
+def test_expired_holders_released_even_under_budget(clock):
+    evicted = []
+    store = make_store(on_evict=evicted.append)
+    store.put("old", "segmentation", "x")
+    clock.now += 500
+    store.put("recent", "segmentation", "y")
+    clock.now += 501
+    store.sweep()
+    assert evicted == ["old"]
+
+def test_memory_report_splits_shared_blobs():
+    store = make_store()
+    store.put("a", "segmentation", "shared text")
+    store.put("b", "segmentation", "shared text")
+    report = store.memory_report()
+    assert report["per_holder"]["a"] == report["per_holder"]["b"] == report["resident_bytes"] / 2